@@ -0,0 +1,35 @@
+# =====================================
+# 變數配置的狀態陣列
+# =====================================
+# 取代 tmp_ans / forced / shoot 三個 set: 每個變數在 value (bytearray, 長度 n + 1) 中佔一個 byte,
+# 由以下 flag 組成 (shoot 可以與 forced 同時成立):
+#   0      : 尚未決定 (minimal 解中為 0)
+#   TRUE   : 設為 1 (原本的 tmp_ans)
+#   FORCED : 被強制設為 0 (原本 forced 中的 -var)
+#   SHOOT  : 已探索過的分支變數, 在這個子樹中不能再設為 1 (原本的 shoot)
+# value 由 ClauseCounters 持有, Trail 設定 / 回溯時更新; 查詢只要一次 index, snapshot 為 bytes(value)。
+# 找到的解以 pack 存成 int 的 bit mask (bit v 代表 v = 1), 回傳給呼叫端前再以 unpack 轉回 set。
+TRUE = 1
+FORCED = 2
+SHOOT = 4
+
+_BITS = bytes(b"1"[0] if x & TRUE else b"0"[0] for x in range(256)) # translate 用: TRUE -> "1", 其他 -> "0"
+
+def pack(value : bytearray) -> int:
+    return int(value.translate(_BITS)[::-1], 2)
+
+def unpack(bits : int) -> set:
+    return {v for v, c in enumerate(bin(bits)[:1:-1]) if c == "1"}
+
+def true_vars(value : bytearray) -> set:
+    return unpack(pack(value))
+
+def forced_lits(value : bytearray) -> set:
+    # 與原本 forced 相同, 以負 literal 表示
+    return {-v for v, x in enumerate(value) if x & FORCED}
+
+def shoot_vars(value : bytearray) -> set:
+    return {v for v, x in enumerate(value) if x & SHOOT}
+
+def count(value : bytearray, flag : int) -> int:
+    return sum(1 for x in value if x & flag)
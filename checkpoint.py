@@ -0,0 +1,43 @@
+import os
+import json
+from instance_cache import file_hash
+
+# =====================================
+# H_1.1'' 搜尋的 checkpoint 檔
+# =====================================
+# 搜尋前緣 (frontier) 以「根到目前最深節點的分支變數」(path) 加上該節點已處理的兄弟分支數 (top) 表示,
+# 續跑時沿 path 重播 (Solver._replay3) 就能回到暫停時的狀態, 不需要存 pq / trail。
+# 檔案為 JSON, 以 instance 內容的 hash 確認是同一個題目, 並記錄會改變搜尋順序的設定 (settings),
+# 兩者有一個不符就不能重播, 從頭開始。
+FORMAT_VERSION = 2
+
+def save(path : str, file_path : str, settings : dict, state : dict):
+    data = dict(state, version=FORMAT_VERSION, instance=file_hash(file_path), settings=settings)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path) # 寫完再換名, 中途被中斷不會留下壞掉的 checkpoint
+
+def load(path : str, file_path : str, settings : dict):
+    # 回傳 state dict; 檔案不存在、格式不符、不是同一個 instance 或設定不同回傳 None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data["version"] != FORMAT_VERSION or data["instance"] != file_hash(file_path):
+            print(f"[Warning] checkpoint 與目前的檔案不符, 重新開始：{path}")
+            return None
+        if data["settings"] != settings:
+            print(f"[Warning] checkpoint 的搜尋設定 {data['settings']} 與目前的 {settings} 不同, 重新開始：{path}")
+            return None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[Warning] 無法讀取 checkpoint, 重新開始：{e}")
+        return None
+    return data
+
+def remove(path : str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,260 @@
+from array import array
+from assignment import TRUE, FORCED, SHOOT
+try:
+    import numpy as np
+except ImportError: # numpy 為選用套件, 沒有時以純 Python 建 occurrence index
+    np = None
+
+# =====================================
+# 扁平化 (array-backed) 的 clause database
+# =====================================
+#   lits  : 所有子句的 literal 依序接成一條 int32 buffer
+#   start : 第 cid 個子句為 lits[start[cid] : start[cid + 1]]
+#   pos_start / pos_cids : 變數 v 以「正」literal 出現的子句 id 為 pos_cids[pos_start[v] : pos_start[v + 1]]
+#   neg_start / neg_cids : 同上, 「負」literal
+# db[cid] 回傳該子句 (array, 保留原本 literal 順序), 因此可以直接取代 list of lists 使用。
+class ClauseDB:
+    def __init__(self, n : int, clauses = ()):
+        self.n = n
+        self.lits = array('i')
+        self.start = array('q', [0])
+        self.pos_start = None
+        self.pos_cids = None
+        self.neg_start = None
+        self.neg_cids = None
+        for clause in clauses:
+            self.append(clause)
+        self.build_occurrences()
+
+    def __len__(self):
+        return len(self.start) - 1
+
+    def __getitem__(self, cid):
+        if isinstance(cid, slice): # db[a:b] 回傳 list of lists (顯示用)
+            return [self[i].tolist() for i in range(*cid.indices(len(self)))]
+        return self.lits[self.start[cid]:self.start[cid + 1]]
+
+    def __iter__(self):
+        lits, start = self.lits, self.start
+        for cid in range(len(start) - 1):
+            yield lits[start[cid]:start[cid + 1]]
+
+    def __repr__(self):
+        return repr([c.tolist() for c in self])
+
+    def append(self, clause):
+        # 只加入 literal, occurrence index 需再呼叫 build_occurrences()
+        self.lits.extend(clause)
+        self.start.append(len(self.lits))
+
+    def build_occurrences(self):
+        lits, start = self.lits, self.start
+        n = max(self.n, max(lits, default=0), -min(lits, default=0))
+        self.n = n
+
+        if np is not None and len(lits) >= 100000: # 大檔用 numpy 的 stable argsort 建立
+            self._build_occurrences_np()
+            return
+
+        pos_cnt = [0] * (n + 2)
+        neg_cnt = [0] * (n + 2)
+        for l in lits:
+            if l > 0:
+                pos_cnt[l + 1] += 1
+            else:
+                neg_cnt[-l + 1] += 1
+        for v in range(1, n + 2):
+            pos_cnt[v] += pos_cnt[v - 1]
+            neg_cnt[v] += neg_cnt[v - 1]
+        self.pos_start = array('q', pos_cnt)
+        self.neg_start = array('q', neg_cnt)
+
+        pos_cids = array('i', bytes(4 * pos_cnt[n + 1]))
+        neg_cids = array('i', bytes(4 * neg_cnt[n + 1]))
+        pos_fill = pos_cnt[:]
+        neg_fill = neg_cnt[:]
+        for cid in range(len(start) - 1):
+            for l in lits[start[cid]:start[cid + 1]]:
+                if l > 0:
+                    pos_cids[pos_fill[l]] = cid
+                    pos_fill[l] += 1
+                else:
+                    neg_cids[neg_fill[-l]] = cid
+                    neg_fill[-l] += 1
+        self.pos_cids = pos_cids
+        self.neg_cids = neg_cids
+
+    def _build_occurrences_np(self):
+        n, m = self.n, len(self)
+        L = np.frombuffer(self.lits, dtype=np.intc)
+        sizes = np.diff(np.frombuffer(self.start, dtype=np.int64))
+        cid_of = np.repeat(np.arange(m, dtype=np.intc), sizes)
+        for sign, name in ((1, "pos"), (-1, "neg")):
+            mask = L > 0 if sign > 0 else L < 0
+            v = L[mask] * sign
+            cids = cid_of[mask][np.argsort(v, kind="stable")]
+            offsets = np.zeros(n + 2, dtype=np.int64)
+            np.cumsum(np.bincount(v, minlength=n + 1), out=offsets[1:])
+            occ_start = array('q')
+            occ_start.frombytes(offsets.tobytes())
+            occ_cids = array('i')
+            occ_cids.frombytes(cids.astype(np.intc).tobytes())
+            setattr(self, name + "_start", occ_start)
+            setattr(self, name + "_cids", occ_cids)
+
+    def pos_occ(self, v : int):
+        # 含 literal v 的子句 id
+        return self.pos_cids[self.pos_start[v]:self.pos_start[v + 1]]
+
+    def neg_occ(self, v : int):
+        # 含 literal -v 的子句 id
+        return self.neg_cids[self.neg_start[v]:self.neg_start[v + 1]]
+
+    def occ(self, v : int):
+        # 含 v 或 -v 的所有子句 id
+        return self.pos_occ(v) + self.neg_occ(v)
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.lits, self.start, self.pos_start, self.pos_cids, self.neg_start, self.neg_cids))
+
+
+# =====================================
+# 每個子句的增量計數器 (給 H_1^' / H_1^'' 權重用)
+# =====================================
+# 以 delta 更新, 讓 _weight_counting1c 不用重新掃描子句:
+#   sat[cid] : 已被滿足的 literal 數 (正 literal 的變數在 tmp_ans, 或負 literal 在 forced)
+#   C[cid]   : 變數已在 tmp_ans 的負 literal 數 (#-C)
+#   F0[cid]  : 變數被 forced 成 0 的正 literal 數 (AF + BF)
+#   U[cid]   : 尚未觸碰且沒被 forced 的正 literal 數 (A - AF)
+#   SH[cid]  : 變數在 shoot 中且沒被 forced 的正 literal 數 (bonus 用)
+#   size / nneg : 子句長度與負 literal 數 (固定)
+#   value[var] : 變數的配置狀態 (TRUE / FORCED / SHOOT flag, 見 assignment.py)
+# 變化由 Trail 在設定 / forced / shoot / touched_cnt 改變 (以及回溯) 時呼叫, 同時更新 value。
+class ClauseCounters:
+    def __init__(self, db : ClauseDB, touched_cnt : list):
+        self.db = db
+        self.touched_cnt = touched_cnt
+        self.value = bytearray(db.n + 1)
+        # 以 array 存放, 可零複製地轉成 numpy view (見 batch_weights.py)
+        m = len(db)
+        self.size = array('i', bytes(4 * m))
+        self.nneg = array('i', bytes(4 * m))
+        self.sat = array('i', bytes(4 * m))
+        self.C = array('i', bytes(4 * m))
+        self.F0 = array('i', bytes(4 * m))
+        self.U = array('i', bytes(4 * m))
+        self.SH = array('i', bytes(4 * m))
+        for cid, clause in enumerate(db):
+            neg = sum(1 for l in clause if l < 0)
+            self.size[cid] = len(clause)
+            self.nneg[cid] = neg
+            self.U[cid] = sum(1 for l in clause if l > 0 and touched_cnt[l] == 0)
+
+    def extend(self, first : int):
+        # 加入 db 中 id >= first 的新子句 (只在沒有任何 assign / force / touch 時呼叫, 計數從 0 開始)
+        for cid in range(first, len(self.db)):
+            clause = self.db[cid]
+            neg = sum(1 for l in clause if l < 0)
+            self.size.append(len(clause))
+            self.nneg.append(neg)
+            self.sat.append(0)
+            self.C.append(0)
+            self.F0.append(0)
+            self.U.append(len(clause) - neg)
+            self.SH.append(0)
+
+    def bonus(self, cid : int) -> int:
+        # 與 Solver.bonus 相同: 候選 = 沒被 forced 成 0 的正 literal, 沒有候選在 shoot 中為 0,
+        # 候選全部在 shoot 中為 -100, 否則 -4 * (2 - 不在 shoot 中的候選數)
+        S = self.SH[cid]
+        if S == 0:
+            return 0
+        free = self.size[cid] - self.nneg[cid] - self.F0[cid] - S
+        if free == 0:
+            return -100
+        return -4 * (2 - free)
+
+    def assign(self, var : int):
+        self.value[var] |= TRUE
+        sat, C = self.sat, self.C
+        for cid in self.db.pos_occ(var):
+            sat[cid] += 1
+        for cid in self.db.neg_occ(var):
+            C[cid] += 1
+
+    def unassign(self, var : int):
+        self.value[var] &= ~TRUE
+        sat, C = self.sat, self.C
+        for cid in self.db.pos_occ(var):
+            sat[cid] -= 1
+        for cid in self.db.neg_occ(var):
+            C[cid] -= 1
+
+    def force(self, lit : int):
+        # forced 中存的是負 literal (-var 代表 var 被強制為 0)
+        var = -lit
+        value = self.value
+        value[var] |= FORCED
+        F0, U = self.F0, self.U
+        untouched = self.touched_cnt[var] == 0
+        for cid in self.db.pos_occ(var):
+            F0[cid] += 1
+            if untouched:
+                U[cid] -= 1
+        sat = self.sat
+        for cid in self.db.neg_occ(var):
+            sat[cid] += 1
+        if value[var] & SHOOT:
+            SH = self.SH
+            for cid in self.db.pos_occ(var):
+                SH[cid] -= 1
+
+    def unforce(self, lit : int):
+        var = -lit
+        value = self.value
+        value[var] &= ~FORCED
+        F0, U = self.F0, self.U
+        untouched = self.touched_cnt[var] == 0
+        for cid in self.db.pos_occ(var):
+            F0[cid] -= 1
+            if untouched:
+                U[cid] += 1
+        sat = self.sat
+        for cid in self.db.neg_occ(var):
+            sat[cid] -= 1
+        if value[var] & SHOOT:
+            SH = self.SH
+            for cid in self.db.pos_occ(var):
+                SH[cid] += 1
+
+    def shoot(self, var : int):
+        self.value[var] |= SHOOT
+        if self.value[var] & FORCED:
+            return
+        SH = self.SH
+        for cid in self.db.pos_occ(var):
+            SH[cid] += 1
+
+    def unshoot(self, var : int):
+        self.value[var] &= ~SHOOT
+        if self.value[var] & FORCED:
+            return
+        SH = self.SH
+        for cid in self.db.pos_occ(var):
+            SH[cid] -= 1
+
+    def touch(self, var : int):
+        # touched_cnt[var] 由 0 變 1
+        if self.value[var] & FORCED:
+            return
+        U = self.U
+        for cid in self.db.pos_occ(var):
+            U[cid] -= 1
+
+    def untouch(self, var : int):
+        # touched_cnt[var] 由 1 變 0
+        if self.value[var] & FORCED:
+            return
+        U = self.U
+        for cid in self.db.pos_occ(var):
+            U[cid] += 1
@@ -0,0 +1,71 @@
+# =====================================
+# 公式的 connected component 分解
+# =====================================
+# 變數-子句圖中互不相連的部分可以分開求解:
+#   可滿足 = 每個 component 都可滿足, 解 = 各 component 的解合併 (conjunction)
+#   列舉   = 各 component 解集合的 Cartesian product (不相交的 component, minimal 解的組合仍是 minimal)
+# 給 true_vars / false_vars 時先以部分配置化簡 (刪掉已滿足的子句、已為 false 的 literal), 再分解剩下的公式。
+def split_components(clauses, true_vars = (), false_vars = ()) -> list:
+    # 回傳 [(變數 list, 子句 list of lists)], 依最小變數排序; 出現空子句時回傳 None (不可滿足)
+    true_vars, false_vars = set(true_vars), set(false_vars)
+    residual = []
+    for clause in clauses:
+        rest = []
+        satisfied = False
+        for l in clause:
+            v = abs(l)
+            if v in true_vars or v in false_vars:
+                if (l > 0) == (v in true_vars):
+                    satisfied = True
+                    break
+            else:
+                rest.append(l)
+        if satisfied:
+            continue
+        if not rest:
+            return None
+        residual.append(rest)
+
+    # union-find (以變數為節點, 同一子句的變數連在一起)
+    parent = {}
+    def find(v):
+        root = v
+        while parent[root] != root:
+            root = parent[root]
+        while parent[v] != root: # path compression
+            parent[v], v = root, parent[v]
+        return root
+
+    for clause in residual:
+        first = abs(clause[0])
+        parent.setdefault(first, first)
+        for l in clause[1:]:
+            v = abs(l)
+            parent.setdefault(v, v)
+            a, b = find(first), find(v)
+            if a != b:
+                parent[b] = a
+
+    groups = {}
+    for clause in residual:
+        groups.setdefault(find(abs(clause[0])), []).append(clause)
+    comps = []
+    for group in groups.values():
+        comp_vars = sorted({abs(l) for clause in group for l in clause})
+        comps.append((comp_vars, group))
+    comps.sort(key=lambda comp: comp[0][0])
+    return comps
+
+def renumber(comp_vars : list, clauses : list) -> list:
+    # 把 component 的變數重新編號為 1..k (comp_vars[i - 1] <-> i), 回傳新的子句
+    index = {v: i for i, v in enumerate(comp_vars, 1)}
+    return [[index[l] if l > 0 else -index[-l] for l in clause] for clause in clauses]
+
+def solve_component(args) -> tuple:
+    # 在 (子) process 中解一個 component; 回傳 (原本編號的解 list, dfs呼叫次數)
+    from solver2 import Solver
+    comp_vars, clauses, propagation, findOneOrNoSols = args
+    solver = Solver.from_clauses(len(comp_vars), renumber(comp_vars, clauses))
+    solver.propagation = propagation
+    sols = solver.run_heuristic("H_1.1''", False, findOneOrNoSols)
+    return [{comp_vars[v - 1] for v in sol} for sol in sols], solver.dfs_counter
@@ -0,0 +1,132 @@
+import os
+import time
+import queue
+import multiprocessing as mp
+from datetime import timedelta
+from solver2 import Solver
+from assignment import unpack
+from instance_cache import read_dimacs_cached
+
+# =====================================
+# Cube-and-conquer: 把一個 instance 的 H_1.1'' 搜尋樹分給多個 process
+# =====================================
+# - 主 process 把搜尋樹前幾層展開成子問題 (cube), 每個 cube 以「根到該節點的分支變數」(path) 表示
+# - worker 沿 path 重播到該節點 (Solver._replay3) 後只搜尋這個子樹, 因此結果與循序搜尋相同
+# - work stealing: 有 worker 閒置而佇列是空的時候, 忙碌的 worker 把最淺一層尚未展開的分支切出去 (Solver._split3)
+# - 任何 worker 找到解就通知主 process, 其餘 worker 全部停止
+
+def _worker(path : str, file_name : str, cache_dir : str, tasks, results, stop, shared, slice_nodes : int):
+    devnull = open(os.devnull, "w") # 子 process 的輸出丟掉, 避免互相穿插
+    os.dup2(devnull.fileno(), 1)
+    solver = Solver(path, file_name, cache_dir)
+
+    while not stop.is_set():
+        with shared.get_lock():
+            shared[0] += 1 # 閒置的 worker 數
+        try:
+            while True:
+                try:
+                    cube = tasks.get(timeout=0.05)
+                    break
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+        finally:
+            with shared.get_lock():
+                shared[0] -= 1
+        with shared.get_lock():
+            shared[1] -= 1 # 佇列中的 cube 數
+
+        solver.F = solver._initialize_obj(solver.n, solver.clauses)
+        solver.dfs_counter = 0
+        ans = []
+        stolen = 0
+        if solver._replay3(cube, ans, False, True):
+            while not solver._run3(ans, False, True, slice_nodes):
+                if stop.is_set():
+                    return
+                if shared[0] > shared[1]: # 有人閒置而佇列不夠分, 切一個分支出去
+                    sub = solver._split3(cube)
+                    if sub is not None:
+                        with shared.get_lock():
+                            shared[1] += 1
+                            shared[2] += 1 # 產生過的 cube 總數
+                        tasks.put(sub)
+                        stolen += 1
+        results.put((ans, solver.dfs_counter, stolen))
+
+def solve_cube_and_conquer(path : str, file_name : str, jobs : int = None, depth : int = None, cache_dir : str = None, timeout : float = None, slice_nodes : int = 256) -> dict:
+    # 回傳與 find_satisfying_assignments 相同的欄位, 另外有
+    #   status : "sat" / "unsat" / "TIMEOUT" / "ERROR"
+    #   cubes  : 主 process 展開的 cube 數,  stolen : work stealing 切出的 cube 數,  depth : 展開的層數
+    # depth 未指定時逐層加深, 直到 cube 數至少為 jobs 的 4 倍 (最多 8 層)
+    start_time = time.monotonic()
+    jobs = jobs or os.cpu_count() or 1
+    if cache_dir is not None: # 先由主 process 建好 cache, worker 都直接讀 cache
+        os.makedirs(cache_dir, exist_ok=True)
+        read_dimacs_cached(os.path.join(path, file_name), cache_dir)
+
+    solver = Solver(path, file_name, cache_dir)
+    for d in ([depth] if depth is not None else range(1, 9)):
+        solver.F = solver._initialize_obj(solver.n, solver.clauses)
+        solver.dfs_counter = 0
+        ans = []
+        cubes = solver._cubes3(d, ans, False, True)
+        if ans or len(cubes) >= 4 * jobs:
+            break
+
+    result = {
+        "satisfying_assignments": [unpack(x) for x in ans], # 搜尋中的解為 bit mask
+        "dfs_counter": solver.dfs_counter,
+        "status": "sat" if ans else "unsat",
+        "cubes": len(cubes),
+        "stolen": 0,
+        "depth": d,
+    }
+    if ans or not cubes: # 展開途中就有答案
+        result["elapsed_time"] = timedelta(seconds=time.monotonic() - start_time)
+        return result
+
+    ctx = mp.get_context()
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    stop = ctx.Event()
+    shared = ctx.Array("q", [0, len(cubes), len(cubes)]) # 閒置 worker 數, 佇列中的 cube 數, cube 總數
+    for cube in cubes:
+        tasks.put(cube)
+    procs = [ctx.Process(target=_worker, args=(path, file_name, cache_dir, tasks, results, stop, shared, slice_nodes), daemon=True) for _ in range(jobs)]
+    for proc in procs:
+        proc.start()
+
+    finished = 0
+    while finished < shared[2]:
+        wait_for = 0.5
+        if timeout is not None:
+            wait_for = min(wait_for, start_time + timeout - time.monotonic())
+            if wait_for <= 0:
+                result["status"] = "TIMEOUT"
+                break
+        try:
+            ans, nodes, stolen = results.get(timeout=wait_for)
+        except queue.Empty:
+            # 有 worker 異常結束時它手上的 cube 不會有結果, 繼續等會等不完
+            if any(proc.exitcode for proc in procs) or not any(proc.is_alive() for proc in procs):
+                result["status"] = "ERROR"
+                break
+            continue
+        finished += 1
+        result["dfs_counter"] += nodes
+        result["stolen"] += stolen
+        if ans: # worker 傳回的解是 bit mask
+            result["satisfying_assignments"] = [unpack(x) for x in ans]
+            result["status"] = "sat"
+            break
+
+    stop.set()
+    for proc in procs:
+        proc.join(1)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+    result["elapsed_time"] = timedelta(seconds=time.monotonic() - start_time)
+    return result
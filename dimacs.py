@@ -0,0 +1,99 @@
+import os
+import mmap
+import gzip
+import bz2
+import lzma
+import time
+from clause_db import ClauseDB
+
+# =====================================
+# 串流式 DIMACS CNF 讀檔
+# =====================================
+# - 一般檔案用 mmap 逐行讀取, .gz / .xz / .bz2 則透明解壓縮後逐行讀取
+# - 子句以 0 結尾, 可以跨行, 也可以多個子句在同一行
+# - 直接填入 ClauseDB 的 int32 buffer, 不經過 list of lists
+# - SATLIB 檔案結尾的 "%" 之後不再讀取
+OPENERS = {
+    ".gz": gzip.open,
+    ".xz": lzma.open,
+    ".bz2": bz2.open,
+}
+
+def _lines(file_path : str):
+    opener = OPENERS.get(os.path.splitext(file_path)[1].lower())
+    if opener is not None:
+        with opener(file_path, "rb") as f:
+            yield from f
+        return
+
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter(mm.readline, b"")
+
+def _flush(buf : list, carry : list, lits, starts) -> list:
+    # 把累積的子句行一次轉成整數, 依 0 切開填入 ClauseDB; 回傳尚未以 0 結尾的 literal
+    nums = carry + list(map(int, b" ".join(buf).split()))
+    buf.clear()
+    i = 0
+    try:
+        while True:
+            j = nums.index(0, i)
+            if j > i: # 空子句 (單獨的 0) 略過
+                lits.extend(nums[i:j])
+                starts.append(len(lits))
+            i = j + 1
+    except ValueError:
+        return nums[i:]
+
+def read_dimacs(file_path : str, chunk_lines = 65536):
+    # 回傳 (status, n, m, db, stats)
+    #   status : "p cnf n m" 切開的 list (與 Solver.status 相同)
+    #   stats  : 讀檔統計 (bytes, clauses, literals, seconds, MB/s, clauses/s)
+    start_time = time.perf_counter()
+    status = []
+    n = 0
+    m = 0
+    db = ClauseDB(0)
+    lits, starts = db.lits, db.start
+    nbytes = 0
+    buf = [] # 尚未轉換的子句行
+    carry = [] # 跨行 (尚未遇到 0) 的 literal
+
+    for line in _lines(file_path):
+        nbytes += len(line)
+        head = line.lstrip()[:1]
+        if head == b"c" or not head:
+            continue
+        if head == b"%":
+            break
+        if head == b"p":
+            status = [x.decode() for x in line.split()]
+            if len(status) >= 4:
+                n = int(status[2])
+                m = int(status[3])
+            continue
+
+        buf.append(line)
+        if len(buf) >= chunk_lines:
+            carry = _flush(buf, carry, lits, starts)
+
+    carry = _flush(buf, carry, lits, starts)
+    if carry: # 最後一個子句沒有 0 結尾
+        lits.extend(carry)
+        starts.append(len(lits))
+
+    db.n = n
+    db.build_occurrences()
+
+    seconds = time.perf_counter() - start_time
+    stats = {
+        "bytes": nbytes,
+        "clauses": len(db),
+        "literals": len(lits),
+        "seconds": seconds,
+        "MB/s": nbytes / 1e6 / seconds if seconds > 0 else 0.0,
+        "clauses/s": len(db) / seconds if seconds > 0 else 0.0,
+    }
+    return status, n, m, db, stats
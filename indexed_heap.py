@@ -0,0 +1,144 @@
+# =====================================
+# 以 clause id 為索引的 binary heap (addressable priority queue)
+# =====================================
+# 取代 heapq + invalid 的 lazy deletion:
+#   每個 clause 在 heap 中最多只有一個 entry, 順序為 (weight, cid)
+#   pos[cid] : cid 在 heap 中的位置, 不在 heap 中為 -1
+#   key[cid] : cid 目前的 weight
+# push (含 decrease/increase-key) 與 remove 都是 O(log m), heap 大小不會超過 m。
+class IndexedHeap:
+    def __init__(self, m : int, weights = None):
+        # weights[cid] : 初始 weight (以 cid 為 index 的 list / array), 所有子句都放入 heap
+        self.heap = []
+        self.pos = [-1] * m
+        self.key = [0] * m
+        if weights:
+            self.key[:len(weights)] = weights
+            # 排序好的 list 本身就是合法的 heap
+            self.heap = sorted(range(len(weights)), key=lambda cid: (self.key[cid], cid))
+            for i, cid in enumerate(self.heap):
+                self.pos[cid] = i
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return len(self.heap) != 0
+
+    def __contains__(self, cid : int):
+        return self.pos[cid] >= 0
+
+    def __repr__(self):
+        return repr(sorted((self.key[cid], cid) for cid in self.heap))
+
+    def get(self, cid : int):
+        # 不在 heap 中回傳 None
+        if self.pos[cid] < 0:
+            return None
+        return self.key[cid]
+
+    def top(self) -> tuple:
+        cid = self.heap[0]
+        return (self.key[cid], cid)
+
+    def push(self, cid : int, weight : int):
+        # 加入 cid, 若已存在則更新 weight; 回傳舊的 weight (不存在為 None)
+        i = self.pos[cid]
+        if i < 0:
+            self.key[cid] = weight
+            self.heap.append(cid)
+            self.pos[cid] = len(self.heap) - 1
+            self._up(len(self.heap) - 1)
+            return None
+        old = self.key[cid]
+        if old != weight:
+            self.key[cid] = weight
+            if weight < old:
+                self._up(i)
+            else:
+                self._down(i)
+        return old
+
+    def pop(self) -> tuple:
+        cid = self.heap[0]
+        weight = self.key[cid]
+        self._delete(0)
+        return (weight, cid)
+
+    def remove(self, cid : int):
+        # 移除 cid; 回傳舊的 weight (不存在為 None)
+        i = self.pos[cid]
+        if i < 0:
+            return None
+        self._delete(i)
+        return self.key[cid]
+
+    def grow(self, m : int):
+        # 讓 cid < m 都可以放入 heap (新增子句用)
+        self.pos.extend([-1] * (m - len(self.pos)))
+        self.key.extend([0] * (m - len(self.key)))
+
+    def snapshot(self) -> tuple:
+        return (self.heap[:], self.key[:])
+
+    def restore(self, snap : tuple):
+        heap, key = snap
+        for cid in self.heap:
+            self.pos[cid] = -1
+        self.heap = heap[:]
+        self.key = key[:]
+        for i, cid in enumerate(self.heap):
+            self.pos[cid] = i
+
+    # ---------- 內部 ----------
+    def _delete(self, i : int):
+        heap = self.heap
+        cid = heap[i]
+        last = heap.pop()
+        self.pos[cid] = -1
+        if i < len(heap):
+            heap[i] = last
+            self.pos[last] = i
+            self._down(i)
+            self._up(self.pos[last])
+
+    def _up(self, i : int):
+        heap, pos, key = self.heap, self.pos, self.key
+        cid = heap[i]
+        k = key[cid]
+        while i > 0:
+            p = (i - 1) >> 1
+            pc = heap[p]
+            pk = key[pc]
+            if pk < k or (pk == k and pc < cid):
+                break
+            heap[i] = pc
+            pos[pc] = i
+            i = p
+        heap[i] = cid
+        pos[cid] = i
+
+    def _down(self, i : int):
+        heap, pos, key = self.heap, self.pos, self.key
+        n = len(heap)
+        cid = heap[i]
+        k = key[cid]
+        while True:
+            c = 2 * i + 1
+            if c >= n:
+                break
+            cc = heap[c]
+            ck = key[cc]
+            r = c + 1
+            if r < n:
+                rc = heap[r]
+                rk = key[rc]
+                if rk < ck or (rk == ck and rc < cc):
+                    c, cc, ck = r, rc, rk
+            if k < ck or (k == ck and cid < cc):
+                break
+            heap[i] = cc
+            pos[cc] = i
+            i = c
+        heap[i] = cid
+        pos[cid] = i
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from array import array
+from clause_db import ClauseDB
+from dimacs import read_dimacs
+
+# =====================================
+# 已解析 instance 的二進位 cache
+# =====================================
+# 以「檔案內容的 hash + 格式版本」為 key, 把 ClauseDB 的 array (literal buffer, offset,
+# 正/負 occurrence index) 直接寫成二進位檔, 之後重複讀同一個 .cnf 時不必重新解析。
+#   檔名   : <hash>.v<FORMAT_VERSION>.bin
+#   內容   : MAGIC + header 長度 (8 bytes) + JSON header + 依序排列的 array
+# cache 目錄總大小超過 max_bytes 時, 依最近使用時間 (mtime) 由舊到新刪除。
+MAGIC = b"PQSATDB\0"
+FORMAT_VERSION = 1
+ARRAYS = ("lits", "start", "pos_start", "pos_cids", "neg_start", "neg_cids")
+
+def file_hash(file_path : str) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_file(cache_dir : str, key : str) -> str:
+    return os.path.join(cache_dir, f"{key}.v{FORMAT_VERSION}.bin")
+
+def load(path : str):
+    # 回傳 (status, n, m, db); 檔案不存在或格式不符回傳 None
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size))
+            if header["version"] != FORMAT_VERSION or header["byteorder"] != sys.byteorder:
+                return None
+            db = ClauseDB(0)
+            for name in ARRAYS:
+                typecode, length = header["arrays"][name]
+                a = array(typecode)
+                a.fromfile(f, length)
+                setattr(db, name, a)
+            db.n = header["n_vars"]
+    except (OSError, ValueError, KeyError, EOFError):
+        return None
+    os.utime(path) # 更新最近使用時間 (LRU)
+    return header["status"], header["n"], header["m"], db
+
+def store(path : str, status : list, n : int, m : int, db : ClauseDB):
+    header = {
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "status": status,
+        "n": n,
+        "m": m,
+        "n_vars": db.n,
+        "arrays": {name: (getattr(db, name).typecode, len(getattr(db, name))) for name in ARRAYS},
+    }
+    raw = json.dumps(header).encode()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(raw).to_bytes(8, "little"))
+        f.write(raw)
+        for name in ARRAYS:
+            getattr(db, name).tofile(f)
+    os.replace(tmp, path) # 寫完再換名, 避免其他 process 讀到一半的檔案
+
+def evict(cache_dir : str, max_bytes : int):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".bin"):
+            continue
+        p = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(p)
+        except OSError:
+            continue
+        total -= size
+
+def read_dimacs_cached(file_path : str, cache_dir : str, max_bytes = 1 << 30):
+    # 與 read_dimacs 相同的回傳值; stats["cache"] 為 "hit" 或 "miss"
+    start_time = time.perf_counter()
+    path = cache_file(cache_dir, file_hash(file_path))
+
+    hit = load(path)
+    if hit is not None:
+        status, n, m, db = hit
+        seconds = time.perf_counter() - start_time
+        stats = {
+            "bytes": os.path.getsize(file_path),
+            "clauses": len(db),
+            "literals": len(db.lits),
+            "seconds": seconds,
+            "MB/s": os.path.getsize(file_path) / 1e6 / seconds if seconds > 0 else 0.0,
+            "clauses/s": len(db) / seconds if seconds > 0 else 0.0,
+            "cache": "hit",
+        }
+        return status, n, m, db, stats
+
+    status, n, m, db, stats = read_dimacs(file_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        store(path, status, n, m, db)
+        evict(cache_dir, max_bytes)
+    except OSError as e: # cache 寫入失敗不影響讀檔結果
+        print(f"[Warning] 無法寫入 cache：{e}")
+    stats["cache"] = "miss"
+    return status, n, m, db, stats
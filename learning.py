@@ -0,0 +1,121 @@
+from array import array
+from assignment import TRUE, FORCED
+
+# =====================================
+# 衝突學習 (conflict-driven clause learning)
+# =====================================
+# 只從真正的衝突學習 (watched literal 找到全部為 false 的子句); shoot / bonus == -100 的剪枝
+# 是搜尋順序上的限制, 不是邏輯上的衝突, 不能拿來學。
+#   reason[v] : v 是被哪個子句 (watched literal 傳遞) 推出來的, -1 代表是決策 (分支變數或權重的 unit clause)
+#   level[v]  : v 被設定時的搜尋深度 (用來算 LBD)
+# 分析時從衝突子句出發, 把被推出來的變數換成它的 reason 子句 (resolution), 直到只剩決策變數,
+# 得到的子句一定被原本的公式蘊含, 加入 WatchedLiterals 後在其他分支就能提早發現同樣的衝突。
+# 學到的子句刻意只放在 WatchedLiterals 中, 不加入 ClauseDB 與 pq 的權重計算: 它們並非不會進 pq
+# (例如兩個變數為 1 的 3-literal 負子句權重為 -12 + 3 = -9, 已低於 unit 的門檻 -8), 但 unit clause 與衝突的作用
+# watched literal 傳遞已經涵蓋; 加入權重還得在搜尋中擴充 counters / invalid / pq / BatchWeights (像 _extend_obj),
+# 並會改變 H_1.1'' 的搜尋順序 (前處理產生較長的子句時就曾讓搜尋漏掉解, 見 preprocess.py 的 bve_clause_limit)。
+# 學到的子句超過 max_learned 時, 保留 LBD <= 2 的 (glue) 與正在當 reason 的, 其餘依 (LBD, activity) 刪掉一半。
+# last 為最近一次分析的結果 (含長度 < 2 而沒有加入的), Solver.solve 用來從 assumption 的衝突找出 failed assumptions。
+class ClauseLearner:
+    def __init__(self, watch, n : int, max_learned = 2000):
+        self.watch = watch
+        self.reason = array('i', [-1] * (n + 1))
+        self.level = array('i', bytes(4 * (n + 1)))
+        self.max_learned = max_learned
+        self.lbd = {}      # 學到的子句 id -> LBD
+        self.activity = {} # 學到的子句 id -> activity
+        self.implied = {}  # 學到的子句 id -> 最近一次由它推出來的變數
+        self.free = []     # 可重複使用的子句 id
+        self.next_id = watch.m
+        self.inc = 1.0
+        self.stats = {"conflicts": 0, "learned": 0, "deleted": 0}
+        self.last = None
+
+    def transfer(self, watch):
+        # 原本的子句變多 (watch 重建) 時, 把學到的子句搬到新的 watch 上; 只在根 (沒有任何設定) 時呼叫
+        new = ClauseLearner(watch, len(self.reason) - 1, self.max_learned)
+        for c in self.lbd:
+            lits = self.watch.clause(c)
+            cid = new._alloc()
+            watch.add_clause(cid, lits, lits[0], lits[1])
+            new.lbd[cid] = self.lbd[c]
+            new.activity[cid] = self.activity[c]
+        new.inc = self.inc
+        new.stats = self.stats
+        return new
+
+    def set_reason(self, var : int, cid : int, depth : int):
+        self.reason[var] = cid
+        self.level[var] = depth
+        if cid >= self.watch.m:
+            self.implied[cid] = var
+
+    def analyze(self, cid : int) -> list:
+        # 回傳學到的子句 (每個 literal 在目前的配置下都是 false)
+        reason, m = self.reason, self.watch.m
+        seen = set()
+        learned = []
+        todo = [cid]
+        while todo:
+            c = todo.pop()
+            if c >= m:
+                self._bump(c)
+            for l in self.watch.clause(c):
+                v = abs(l)
+                if v in seen:
+                    continue
+                seen.add(v)
+                r = reason[v]
+                if r >= 0:
+                    todo.append(r)
+                else:
+                    learned.append(l)
+        return learned
+
+    def learn(self, cid : int):
+        # 分析衝突子句 cid 並加入學到的子句; 長度 < 2 的不加入 (watched literal 需要兩個 literal)
+        self.stats["conflicts"] += 1
+        lits = self.last = self.analyze(cid)
+        if len(lits) < 2:
+            return
+        level = self.level
+        lits.sort(key=lambda l: level[abs(l)], reverse=True) # 看最晚被設定的兩個 literal, 回溯時最先變回非 false
+        new = self.free.pop() if self.free else self._alloc()
+        self.watch.add_clause(new, lits, lits[0], lits[1])
+        self.lbd[new] = len({level[abs(l)] for l in lits})
+        self.activity[new] = self.inc
+        self.stats["learned"] += 1
+        self.inc *= 1.05 # activity 衰減 (以放大增量代替)
+        if self.inc > 1e100:
+            for c in self.activity:
+                self.activity[c] *= 1e-100
+            self.inc *= 1e-100
+        if len(self.lbd) > self.max_learned:
+            self.reduce()
+
+    def reduce(self):
+        watch = self.watch
+        cand = []
+        for c, lbd in self.lbd.items():
+            if lbd <= 2:
+                continue
+            v = self.implied.get(c)
+            if v is not None and self.reason[v] == c and watch.value[v] & (TRUE | FORCED): # 正在當 reason
+                continue
+            cand.append(c)
+        cand.sort(key=lambda c: (-self.lbd[c], self.activity[c]))
+        for c in cand[:len(cand) // 2]:
+            watch.remove_clause(c)
+            del self.lbd[c]
+            del self.activity[c]
+            self.implied.pop(c, None)
+            self.free.append(c)
+            self.stats["deleted"] += 1
+
+    def _alloc(self) -> int:
+        cid = self.next_id
+        self.next_id += 1
+        return cid
+
+    def _bump(self, cid : int):
+        self.activity[cid] = self.activity.get(cid, 0.0) + self.inc
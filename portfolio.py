@@ -0,0 +1,86 @@
+import os
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from datetime import timedelta
+from solver2 import Solver
+from instance_cache import read_dimacs_cached
+
+# =====================================
+# Heuristic portfolio: 同一個 instance 同時以多個 heuristic 求解
+# =====================================
+# 每個 heuristic 一個子 process (findOneOrNoSols), 第一個給出確定答案
+# (檢驗正確的 sat 解, 或 unsat) 的就是 winner, 其餘的立即 terminate。
+
+def _worker(conn, path : str, file_name : str, cache_dir : str, heuristic : str):
+    devnull = open(os.devnull, "w") # 子 process 的輸出丟掉, 避免互相穿插
+    os.dup2(devnull.fileno(), 1)
+    solver = Solver(path, file_name, cache_dir)
+    start = time.perf_counter()
+    ans = solver.run_heuristic(heuristic)
+    seconds = time.perf_counter() - start
+    errors = solver.check_solution(ans, verbose=False)
+    conn.send((heuristic, ans, solver.dfs_counter, seconds, bool(errors)))
+    conn.close()
+
+def solve_portfolio(path : str, file_name : str, heuristics = Solver.HEURISTICS, cache_dir : str = None, timeout : float = None) -> dict:
+    # 回傳與 find_satisfying_assignments 相同的欄位, 另外有
+    #   status  : "sat" / "unsat" / "TIMEOUT" / "UNKNOWN" (全部結束但沒有確定答案)
+    #   winner  : 給出答案的 heuristic (沒有則為 None)
+    #   results : 每個 heuristic 的 (結果, dfs呼叫次數, 秒數); 被取消的為 ("cancelled", None, None)
+    start_time = time.monotonic()
+    if cache_dir is not None: # 先由主 process 建好 cache, 子 process 都直接讀 cache
+        os.makedirs(cache_dir, exist_ok=True)
+        read_dimacs_cached(os.path.join(path, file_name), cache_dir)
+
+    ctx = mp.get_context()
+    running = {}
+    for heuristic in heuristics:
+        parent, child = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_worker, args=(child, path, file_name, cache_dir, heuristic), daemon=True)
+        proc.start()
+        child.close()
+        running[parent] = (heuristic, proc)
+
+    result = {
+        "satisfying_assignments": [],
+        "dfs_counter": 0,
+        "status": "UNKNOWN",
+        "winner": None,
+        "results": {},
+    }
+    while running:
+        wait_for = None
+        if timeout is not None:
+            wait_for = start_time + timeout - time.monotonic()
+            if wait_for <= 0:
+                result["status"] = "TIMEOUT"
+                break
+
+        for conn in wait(list(running), wait_for):
+            heuristic, proc = running.pop(conn)
+            try:
+                _, ans, dfs_counter, seconds, wrong = conn.recv()
+                status = "wrong" if wrong else ("sat" if ans else "unsat")
+            except EOFError: # 子 process 異常結束
+                ans, dfs_counter, seconds, status = [], None, None, "ERROR"
+            conn.close()
+            proc.join()
+            result["results"][heuristic] = (status, dfs_counter, seconds)
+            if status in ("sat", "unsat") and result["winner"] is None:
+                result["satisfying_assignments"] = ans
+                result["dfs_counter"] = dfs_counter
+                result["status"] = status
+                result["winner"] = heuristic
+        if result["winner"] is not None:
+            break
+
+    # 取消其餘的 heuristic
+    for conn, (heuristic, proc) in running.items():
+        proc.terminate()
+        proc.join()
+        conn.close()
+        result["results"][heuristic] = ("cancelled", None, None)
+
+    result["elapsed_time"] = timedelta(seconds=time.monotonic() - start_time)
+    return result
@@ -0,0 +1,152 @@
+import time
+from collections import deque
+
+# =====================================
+# CNF 前處理 (在 _initialize_obj 建 PQ 之前化簡公式)
+# =====================================
+#   subsumption               : C ⊆ D 時刪掉 D
+#   self-subsuming resolution : C = C' ∪ {l}, D ⊇ C' ∪ {-l} 時把 -l 從 D 刪掉
+#   pure literal              : 只以一種正負號出現的變數, 刪掉含它的子句
+#   bounded variable elimination (BVE) : 消去變數 v, 以 v 的所有 (非 tautology) resolvent 取代含 v / -v 的子句,
+#                                        只有 resolvent 數量不超過原本子句數, 且每個 resolvent 都不超過
+#                                        bve_clause_limit 個 literal 時才做。預設為 3: H_1.1'' 的權重 (unit 的 -8/-9 區間、
+#                                        bonus) 是依 3-SAT 的子句長度設計的, 較長的 resolvent 會讓搜尋漏掉解
+#                                        (uf20-91 上可滿足的題目被判為不可滿足), 因此不產生比原本 3-SAT 子句更長的子句。
+# 變數編號不變, 只是子句變少; 被消去的變數記在 stack 中 (變數, 原本含它的子句),
+# reconstruct 依相反順序把化簡後公式的解還原成原本公式的解:
+#   先設 v = 0, 若有記錄的子句因此不滿足就改成 v = 1 (pure literal 與 BVE 都成立)。
+# 前處理只保留可滿足性 (找一個解用), 列舉時解的集合會不同。
+class Preprocessor:
+    def __init__(self, n : int, clauses, bve_occ_limit = 16, bve_clause_limit = 3, max_rounds = 10):
+        self.n = n
+        self.bve_occ_limit = bve_occ_limit # 變數出現次數 (正 + 負) 超過此值就不消去
+        self.bve_clause_limit = bve_clause_limit # resolvent 長度超過此值就不消去 (見上方說明)
+        self.max_rounds = max_rounds
+        self.clauses = {} # cid -> frozenset(literal)
+        self.occ = {} # literal -> set(cid)
+        self.stack = [] # (變數, 原本含它的子句) 依消去順序
+        self.unsat = False
+        self.next_id = 0
+        self.stats = {"tautologies": 0, "subsumed": 0, "strengthened": 0, "pure": 0, "eliminated": 0}
+        for clause in clauses:
+            c = frozenset(clause)
+            if any(-l in c for l in c):
+                self.stats["tautologies"] += 1
+                continue
+            self._add(c)
+        self.stats["clauses_before"] = len(self.clauses)
+
+    def run(self) -> list:
+        # 回傳化簡後的子句 (list of lists)
+        start_time = time.perf_counter()
+        for _ in range(self.max_rounds):
+            if self.unsat:
+                break
+            changed = self.subsume()
+            changed |= self.pure_literals()
+            changed |= self.eliminate()
+            if not changed:
+                break
+        self.stats["clauses_after"] = len(self.clauses)
+        self.stats["seconds"] = time.perf_counter() - start_time
+        return [sorted(c, key=abs) for _, c in sorted(self.clauses.items())]
+
+    def reconstruct(self, sol : set) -> set:
+        # 化簡後公式的解 (值為 1 的變數) -> 原本公式的解
+        sol = set(sol)
+        for var, clauses in reversed(self.stack):
+            sol.discard(var)
+            if not all(any((l > 0 and l in sol) or (l < 0 and -l not in sol) for l in c) for c in clauses):
+                sol.add(var)
+        return sol
+
+    # ---------- passes ----------
+    def subsume(self) -> bool:
+        # subsumption + self-subsuming resolution, 由短的子句開始
+        clauses, occ = self.clauses, self.occ
+        changed = False
+        queue = deque(sorted(clauses, key=lambda cid: len(clauses[cid])))
+        while queue and not self.unsat:
+            cid = queue.popleft()
+            C = clauses.get(cid)
+            if C is None:
+                continue
+            l0 = min(C, key=lambda l: len(occ.get(l, ())))
+            for d in list(occ.get(l0, ())):
+                if d != cid and len(clauses[d]) >= len(C) and C <= clauses[d]:
+                    self._remove(d)
+                    self.stats["subsumed"] += 1
+                    changed = True
+            for l in C:
+                rest = C - {l}
+                for d in list(occ.get(-l, ())):
+                    D = clauses[d]
+                    if len(D) >= len(C) and rest <= D:
+                        self._remove(d)
+                        queue.append(self._add(D - {-l})) # 變短的子句可能再 subsume 其他子句
+                        self.stats["strengthened"] += 1
+                        changed = True
+        return changed
+
+    def pure_literals(self) -> bool:
+        changed = False
+        for var in range(1, self.n + 1):
+            p, q = self.occ.get(var), self.occ.get(-var)
+            if bool(p) != bool(q):
+                self._eliminate(var, list(p or q))
+                self.stats["pure"] += 1
+                changed = True
+        return changed
+
+    def eliminate(self) -> bool:
+        # BVE, 出現次數少的變數先試
+        occ = self.occ
+        changed = False
+        order = sorted(range(1, self.n + 1), key=lambda v: len(occ.get(v, ())) + len(occ.get(-v, ())))
+        for var in order:
+            if self.unsat:
+                break
+            P, N = occ.get(var), occ.get(-var)
+            if not P or not N or len(P) + len(N) > self.bve_occ_limit:
+                continue
+            resolvents = set()
+            for p in P:
+                Cp = self.clauses[p] - {var}
+                for q in N:
+                    r = Cp | (self.clauses[q] - {-var})
+                    if any(-l in r for l in r): # tautology
+                        continue
+                    if len(r) > self.bve_clause_limit:
+                        resolvents = None
+                        break
+                    resolvents.add(r)
+                if resolvents is None or len(resolvents) > len(P) + len(N):
+                    break
+            if resolvents is None or len(resolvents) > len(P) + len(N):
+                continue
+            self._eliminate(var, list(P) + list(N))
+            for r in resolvents:
+                self._add(r)
+            self.stats["eliminated"] += 1
+            changed = True
+        return changed
+
+    # ---------- 內部 ----------
+    def _add(self, c : frozenset) -> int:
+        if not c:
+            self.unsat = True
+        cid = self.next_id
+        self.next_id += 1
+        self.clauses[cid] = c
+        for l in c:
+            self.occ.setdefault(l, set()).add(cid)
+        return cid
+
+    def _remove(self, cid : int):
+        for l in self.clauses.pop(cid):
+            self.occ[l].discard(cid)
+
+    def _eliminate(self, var : int, cids : list):
+        self.stack.append((var, [self.clauses[cid] for cid in cids]))
+        for cid in cids:
+            self._remove(cid)
@@ -0,0 +1,66 @@
+import sys
+import json
+import time
+from assignment import TRUE, FORCED, SHOOT, count
+
+# =====================================
+# 搜尋進度 (H_1.1'') 的即時回報
+# =====================================
+# solver.progress = ProgressMonitor(every=N) 後, 每搜尋 N 個節點取樣一次, 輸出一行 JSON:
+#   nodes, elapsed, nodes_per_sec (這一段的速度), depth (目前的 stack 深度), heap (pq 大小),
+#   tmp_ans / forced / shoot (設為 1 / 強制為 0 / 已探索過的變數數), stall
+# 有給 callback 時把 dict 交給 callback, 否則寫到 stream (預設 stderr)。
+# stall: 這一段的速度低於之前各段速度 (EWMA) 的 stall_ratio 倍, 且已經有 warmup 段可以比較;
+# 停滯的段不更新 EWMA, 持續停滯時會一直被標記。
+class ProgressMonitor:
+    def __init__(self, every = 10000, callback = None, stream = None, stall_ratio = 0.1, warmup = 3, smoothing = 0.3):
+        self.every = every
+        self.callback = callback
+        self.stream = stream
+        self.stall_ratio = stall_ratio
+        self.warmup = warmup
+        self.smoothing = smoothing
+        self.stalls = 0
+        self.start(0)
+
+    def start(self, nodes : int):
+        # 每次搜尋開始時呼叫 (nodes 為目前的 dfs_counter)
+        self.start_time = self.last_time = time.perf_counter()
+        self.last_nodes = nodes
+        self.next_sample = nodes + self.every
+        self.rate = None # 之前各段速度的 EWMA
+        self.samples = 0
+
+    def sample(self, solver):
+        now = time.perf_counter()
+        nodes = solver.dfs_counter
+        rate = (nodes - self.last_nodes) / max(now - self.last_time, 1e-9)
+        stall = self.samples >= self.warmup and rate < self.stall_ratio * self.rate
+        if stall:
+            self.stalls += 1
+        else:
+            self.rate = rate if self.rate is None else (1 - self.smoothing) * self.rate + self.smoothing * rate
+        self.samples += 1
+        F = solver.F
+        S = F.search
+        value = F.counters.value
+        record = {
+            "nodes": nodes,
+            "elapsed": now - self.start_time,
+            "nodes_per_sec": rate,
+            "depth": len(S["stack"]),
+            "heap": len(F.pq),
+            "tmp_ans": count(value, TRUE),
+            "forced": count(value, FORCED),
+            "shoot": count(value, SHOOT),
+            "stall": stall,
+        }
+        self.last_time = now
+        self.last_nodes = nodes
+        self.next_sample = nodes + self.every
+        if self.callback is not None:
+            self.callback(record)
+        else:
+            stream = self.stream if self.stream is not None else sys.stderr
+            stream.write(json.dumps(record) + "\n")
+            stream.flush()
@@ -0,0 +1,302 @@
+import io
+import os
+import sys
+import json
+import math
+import time
+import zipfile
+import argparse
+import contextlib
+import platform
+import tempfile
+import subprocess
+import multiprocessing as mp
+from solver2 import Solver
+try:
+    import resource
+except ImportError: # Windows 沒有 resource, 無法量 peak RSS
+    resource = None
+
+# =====================================
+# 效能回歸測試 (SATLIB 題目集)
+# =====================================
+# 直接從 benchmarks/benchmarks.zip 取出固定的 instance (每個題目集依檔名排序取前幾個),
+# 每個 (instance, heuristic 變體) 在獨立的 process 中重複執行 repeats 次, 記錄
+#   seconds (每次的 wall time, 很快的 instance 以多次執行的平均計), dfs_counter, nodes_per_sec, peak_rss (bytes), status
+# 與存好的 baseline (benchmarks/baseline.json) 比較: 時間先除以同一個 process 中固定工作量的 calibration 時間
+# (校正機器速度的飄移), 每個題目集以 log(time) 的差做 z 檢定,
+# 顯著 (p < alpha) 且幾何平均變慢超過 min_effect 才算回歸; dfs_counter 改變另外列出。
+#   python regression_bench.py                     執行並與 baseline 比較 (有回歸時 exit code 為 1)
+#   python regression_bench.py --update-baseline   執行並覆寫 baseline
+#   python regression_bench.py --check-preprocess  檢查 preprocessing 開 / 關的結果是否一致 (不一致時 exit code 為 1)
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ZIP_PATH = os.path.join(ROOT, "benchmarks", "benchmarks.zip")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+FORMAT_VERSION = 1
+
+# 題目集名稱 -> (zip 中的資料夾, 預設取幾個 instance)
+FAMILIES = {
+    "uf20-91": ("uf20-91", 100),
+    "uf50-218": ("uf50-218", 10),
+    "uuf50-218": ("UUF50.218.1000", 10),
+    "uf75-325": ("UF75.325.100", 3),
+}
+
+# heuristic 變體名稱 -> (heuristic, propagation)
+VARIANTS = {
+    "H_1": ("H_1", "weights"),
+    "H_1'": ("H_1'", "weights"),
+    "H_1''": ("H_1''", "weights"),
+    "H_1.1''": ("H_1.1''", "weights"),
+    "H_1.1''+watched": ("H_1.1''", "watched"),
+    "H_1.1''+learning": ("H_1.1''", "learning"),
+}
+
+def extract(dest : str, families, per_family : int = None, zip_path : str = ZIP_PATH) -> dict:
+    # 把選到的 instance 解壓到 dest/<題目集>, 回傳 {題目集: [檔名, ...]}
+    selected = {}
+    with zipfile.ZipFile(zip_path) as zf:
+        names = zf.namelist()
+        for family in families:
+            folder, count = FAMILIES[family]
+            prefix = f"benchmarks/{folder}/"
+            files = sorted(name[len(prefix):] for name in names if name.startswith(prefix) and name.endswith(".cnf") and "/" not in name[len(prefix):])
+            files = files[:per_family if per_family is not None else count]
+            os.makedirs(os.path.join(dest, family), exist_ok=True)
+            for file_name in files:
+                with open(os.path.join(dest, family, file_name), "wb") as f:
+                    f.write(zf.read(prefix + file_name))
+            selected[family] = files
+    return selected
+
+def _measure(conn, path : str, file_name : str, heuristic : str, propagation : str, repeats : int, min_time : float):
+    devnull = open(os.devnull, "w") # 子 process 的輸出丟掉
+    os.dup2(devnull.fileno(), 1)
+    calibration = _calibrate()
+    seconds = []
+    for _ in range(repeats):
+        # 很快的 instance 重複解到至少 min_time 秒再取平均 (同 timeit), 降低計時誤差
+        loops = 0
+        start = time.perf_counter()
+        while True:
+            solver = Solver(path, file_name)
+            solver.propagation = propagation
+            ans = solver.run_heuristic(heuristic)
+            loops += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        seconds.append(elapsed / loops)
+    conn.send((seconds, solver.dfs_counter, "sat" if ans else "unsat", solver._max_rss(), min(calibration, _calibrate())))
+    conn.close()
+
+def measure(path : str, file_name : str, variant : str, repeats : int = 3, timeout : float = None, min_time : float = 0.2) -> dict:
+    # 在新的 (spawn) process 中量測, peak RSS 不會包含其他 instance 的記憶體
+    heuristic, propagation = VARIANTS[variant]
+    ctx = mp.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_measure, args=(child, path, file_name, heuristic, propagation, repeats, min_time), daemon=True)
+    proc.start()
+    child.close()
+    record = {"seconds": [], "dfs_counter": None, "nodes_per_sec": None, "peak_rss": None, "calibration": None, "status": "TIMEOUT"}
+    if parent.poll(timeout):
+        try:
+            seconds, dfs_counter, status, rss, calibration = parent.recv()
+            record.update(seconds=seconds, dfs_counter=dfs_counter, status=status, peak_rss=rss, calibration=calibration,
+                          nodes_per_sec=dfs_counter / _median(seconds))
+        except EOFError: # 子 process 沒回傳結果就結束
+            record["status"] = "ERROR"
+    proc.terminate()
+    proc.join()
+    parent.close()
+    return record
+
+def run_suite(families = tuple(FAMILIES), variants = ("H_1.1''",), per_family : int = None, repeats : int = 3, timeout : float = 300.0, min_time : float = 0.2, zip_path : str = ZIP_PATH) -> dict:
+    data = {
+        "version": FORMAT_VERSION,
+        "meta": _meta(),
+        "settings": {"per_family": per_family, "repeats": repeats, "timeout": timeout, "min_time": min_time},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        selected = extract(tmp, families, per_family, zip_path)
+        for variant in variants:
+            for family, files in selected.items():
+                rows = data["results"].setdefault(variant, {}).setdefault(family, {})
+                for i, file_name in enumerate(files, 1):
+                    rows[file_name] = record = measure(os.path.join(tmp, family), file_name, variant, repeats, timeout, min_time)
+                    print(f"[{variant}] {family} {i}/{len(files)}: {file_name} {record['status']} " + (f"{_median(record['seconds']):.3f}s" if record["seconds"] else ""))
+    return data
+
+# =====================================
+# 前處理的正確性檢查
+# =====================================
+def check_preprocess(family = "uf20-91", per_family : int = None, zip_path : str = ZIP_PATH) -> list:
+    # 同一批 instance 在 preprocessing 關 / 開時以 find_satisfying_assignments 求解, status 必須相同,
+    # 且找到的解必須滿足原本的公式 (不滿足記為 "bad model"); 回傳不一致的 [(檔名, 關閉時, 開啟時)]
+    mismatches = []
+    with tempfile.TemporaryDirectory() as tmp:
+        files = extract(tmp, [family], per_family, zip_path)[family]
+        for i, file_name in enumerate(files, 1):
+            status = []
+            for preprocessing in (False, True):
+                solver = Solver(os.path.join(tmp, family), file_name)
+                solver.preprocessing = preprocessing
+                with contextlib.redirect_stdout(io.StringIO()): # find_satisfying_assignments 會印出結果
+                    result = solver.find_satisfying_assignments()
+                bad = result["status"] == "sat" and solver.check_solution(result["satisfying_assignments"])
+                status.append("bad model" if bad else result["status"])
+            if status[0] != status[1]:
+                mismatches.append((file_name, status[0], status[1]))
+                print(f"[preprocess] {family} {i}/{len(files)}: {file_name} {status[0]} -> {status[1]}")
+    return mismatches
+
+# =====================================
+# 與 baseline 比較
+# =====================================
+def compare(base : dict, new : dict, alpha = 0.01, min_effect = 0.05, noise = 0.01) -> list:
+    # 回傳每個 (變體, 題目集) 一列; noise 為單次量測的相對誤差下限 (避免 repeats 剛好很接近時 z 值過大)
+    rows = []
+    for variant, families in new["results"].items():
+        for family, records in families.items():
+            base_records = base["results"].get(variant, {}).get(family)
+            if base_records is None:
+                continue
+            d_sum = var_sum = 0.0
+            k = 0
+            node_changes = []
+            rss_ratio = []
+            for file_name, rec in records.items():
+                old = base_records.get(file_name)
+                if old is None or not old["seconds"] or not rec["seconds"]:
+                    continue
+                # 以同一個 process 量到的 calibration 時間校正機器速度
+                a = [math.log(x / old["calibration"]) for x in old["seconds"]]
+                b = [math.log(x / rec["calibration"]) for x in rec["seconds"]]
+                d_sum += _mean(b) - _mean(a)
+                var_sum += max(_var(a), noise ** 2) / len(a) + max(_var(b), noise ** 2) / len(b)
+                k += 1
+                if rec["dfs_counter"] != old["dfs_counter"]:
+                    node_changes.append((file_name, old["dfs_counter"], rec["dfs_counter"]))
+                if old["peak_rss"] and rec["peak_rss"]:
+                    rss_ratio.append(rec["peak_rss"] / old["peak_rss"])
+            if k == 0:
+                continue
+            z = d_sum / math.sqrt(var_sum)
+            p = 0.5 * math.erfc(z / math.sqrt(2)) # 單尾: 變慢
+            ratio = math.exp(d_sum / k) # 幾何平均的時間比
+            rows.append({
+                "variant": variant,
+                "family": family,
+                "instances": k,
+                "time_ratio": ratio,
+                "p_value": p,
+                "regression": p < alpha and ratio > 1 + min_effect,
+                "node_changes": node_changes,
+                "rss_ratio": max(rss_ratio) if rss_ratio else None,
+                "timeouts": [f for f, rec in records.items() if rec["status"] in ("TIMEOUT", "ERROR")],
+            })
+    return rows
+
+def report(rows : list):
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        rss = f", peak RSS x{row['rss_ratio']:.2f}" if row["rss_ratio"] is not None else ""
+        print(f"{flag:>10}  [{row['variant']}] {row['family']}: time x{row['time_ratio']:.3f} (p = {row['p_value']:.4f}, {row['instances']} instances){rss}")
+        if row["node_changes"]:
+            print(f"{'':>12}dfs_counter 改變 {len(row['node_changes'])} 個, 例如 {row['node_changes'][0]}")
+        if row["timeouts"]:
+            print(f"{'':>12}TIMEOUT/ERROR: {row['timeouts']}")
+
+def load(path : str) -> dict:
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"baseline 格式版本不符: {path}")
+    return data
+
+def save(path : str, data : dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+def _calibrate(loops = 3) -> float:
+    # 與 solver 無關的固定純 Python 工作量 (dict / int 運算), 取最快的一次當作機器速度的基準
+    best = float("inf")
+    for _ in range(loops):
+        start = time.perf_counter()
+        table = {}
+        acc = 0
+        for i in range(200000):
+            key = i & 1023
+            table[key] = table.get(key, 0) + i
+            acc ^= i * 31
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "resource": resource is not None,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def _mean(xs : list) -> float:
+    return sum(xs) / len(xs)
+
+def _var(xs : list) -> float:
+    if len(xs) < 2:
+        return 0.0
+    m = _mean(xs)
+    return sum((x - m) ** 2 for x in xs) / (len(xs) - 1)
+
+def _median(xs : list) -> float:
+    xs = sorted(xs)
+    k = len(xs) // 2
+    return xs[k] if len(xs) % 2 else (xs[k - 1] + xs[k]) / 2
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description="SATLIB 題目集的效能回歸測試")
+    parser.add_argument("--families", nargs="+", default=list(FAMILIES), choices=list(FAMILIES))
+    parser.add_argument("--variants", nargs="+", default=["H_1.1''"], choices=list(VARIANTS))
+    parser.add_argument("--per-family", type=int, default=None, help="每個題目集取幾個 instance (預設見 FAMILIES)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0, help="每個 (instance, 變體) 的秒數上限")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每次量測至少花幾秒 (很快的 instance 重複執行)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="把這次的結果存成 baseline")
+    parser.add_argument("--out", default=None, help="另外把這次的結果存成 JSON")
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument("--min-effect", type=float, default=0.05, help="幾何平均變慢超過此比例才算回歸")
+    parser.add_argument("--check-preprocess", action="store_true", help="只檢查 preprocessing 開 / 關的 status 是否一致 (--families 的第一個題目集, 預設 uf20-91)")
+    args = parser.parse_args(argv)
+
+    if args.check_preprocess:
+        mismatches = check_preprocess(args.families[0], args.per_family)
+        print(f"preprocessing 開 / 關不一致: {len(mismatches)}")
+        return 1 if mismatches else 0
+
+    data = run_suite(args.families, args.variants, args.per_family, args.repeats, args.timeout, args.min_time)
+    if args.out is not None:
+        save(args.out, data)
+    if args.update_baseline:
+        save(args.baseline, data)
+        print(f"baseline 已更新: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"[Warning] 找不到 baseline: {args.baseline}, 以 --update-baseline 建立")
+        return 0
+    rows = compare(load(args.baseline), data, args.alpha, args.min_effect)
+    report(rows)
+    return 1 if any(row["regression"] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
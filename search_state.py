@@ -0,0 +1,32 @@
+# =====================================
+# 搜尋用的 F 結構 (Solver._initialize_obj 建立)
+# =====================================
+# 原本是以字串為 key 的 dict (self.F["pq"] ...), 熱路徑每個節點都要查好幾次; 改成固定欄位的 __slots__ 物件。
+#   clauses     : ClauseDB
+#   invalid     : 每個子句目前的權重 (array 'q', 以 cid 為 index; 原本是 dict)
+#   pq          : IndexedHeap, 權重 <= 0 的子句
+#   touched_cnt : 每個變數被展開的子句碰到的次數
+#   counters    : ClauseCounters (每個子句的增量計數器, 以及配置 value)
+#   pos_lits    : 子句的正 literal 集合 (process 用, 用到時才建立)
+#   batch       : BatchWeights 向量化批次計算 (需要 numpy, 沒有時為 None)
+#   watch       : WatchedLiterals (propagation 為 "watched" / "learning" 時)
+#   learn       : ClauseLearner (propagation 為 "learning" 時)
+#   stats       : SearchStats (collect_stats 關閉時為 None)
+#   trail       : 回溯用的 Trail
+#   search      : H_1.1'' 的搜尋狀態 (stack 等, 見 Solver._start3), 沒有進行中的搜尋為 None
+class SearchState:
+    __slots__ = ("clauses", "invalid", "pq", "touched_cnt", "counters", "pos_lits", "batch", "watch", "learn", "stats", "trail", "search")
+
+    def __init__(self, clauses, invalid, pq, touched_cnt, counters, batch, watch, learn, stats, trail):
+        self.clauses = clauses
+        self.invalid = invalid
+        self.pq = pq
+        self.touched_cnt = touched_cnt
+        self.counters = counters
+        self.pos_lits = [None] * len(clauses)
+        self.batch = batch
+        self.watch = watch
+        self.learn = learn
+        self.stats = stats
+        self.trail = trail
+        self.search = None
@@ -1,47 +1,84 @@
 import os
-import heapq
-import copy
+import sys
+import errno
+import time
+import itertools
+import multiprocessing as mp
+from array import array
 from datetime import datetime
+from trail import Trail
+from assignment import TRUE, FORCED, SHOOT, pack, unpack, true_vars
+from indexed_heap import IndexedHeap
+from clause_db import ClauseDB, ClauseCounters
+from batch_weights import BatchWeights
+from watches import WatchedLiterals
+from learning import ClauseLearner
+from preprocess import Preprocessor
+from components import split_components, solve_component
+from stats import SearchStats
+from search_state import SearchState
+from dimacs import read_dimacs
+from instance_cache import read_dimacs_cached
+import checkpoint as ckpt
+try:
+    import resource
+except ImportError: # Windows 沒有 resource, 記憶體預算無法檢查
+    resource = None
 
 class Solver:
-    def __init__(self, path: str, file_name: str):
+    def __init__(self, path: str, file_name: str, cache_dir: str = None):
         self.path = path
         self.file_name = file_name
+        self.cache_dir = cache_dir  # 已解析 instance 的 cache 目錄 (None 代表不使用)
         self.n = 0  # 變數數量
         self.m = 0  # 子句數量
         self.status = []   # 存放 p cnf 資訊
-        self.clauses = []  # 存放所有子句
+        self.clauses = ClauseDB(0)  # 存放所有子句
+        self.parse_stats = {}  # 讀檔統計 (throughput)
         self.dfs_counter = 0
-
-        self.readfile()  # 初始化時自動讀檔
+        self.batch_threshold = 128 # touched 子句數達到此值 (且有 numpy) 時改用批次計算
+        self.preprocessing = False # find_satisfying_assignments 前先化簡公式 (preprocess.py)
+        self.preprocess_stats = {}
+        self.propagation = "weights" # H_1.1'' 的 unit clause 傳遞: "weights" 只看權重, "watched" 另外用 watched literal, "learning" 再加上衝突學習
+        self.decompose = False # find_satisfying_assignments 時把公式拆成 connected component 分開搜尋 (components.py)
+        self.decompose_jobs = 1 # 同時求解 component 的 process 數
+        self.components = [] # 最近一次分解得到的每個 component 的變數數
+        self.F_incremental = None # solve() 在多次呼叫之間重複使用的 F 結構
+        self.collect_stats = False # 收集搜尋統計 (stats.py), 關閉時幾乎沒有額外成本
+        self.search_stats = None # 最近一次搜尋的 SearchStats (collect_stats 為 False 時為 None)
+        self.progress = None # H_1.1'' 搜尋進度回報 (progress.ProgressMonitor), None 代表不回報
+
+        if file_name is not None:
+            self.readfile()  # 初始化時自動讀檔
+
+    @classmethod
+    def from_clauses(cls, n : int, clauses : list):
+        # 不讀檔, 直接以子句 (list of lists) 建立 Solver
+        solver = cls("", None)
+        solver.n = n
+        solver.m = len(clauses)
+        solver.status = ["p", "cnf", str(n), str(len(clauses))]
+        solver.clauses = ClauseDB(n, clauses)
+        return solver
 
     def readfile(self):
         file_path = os.path.join(self.path, self.file_name)
 
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-
-            for line in lines:
-                line = line.strip()
-
-                if not line or line.startswith(('c', '%', '0')):
-                    continue
-
-                if line.startswith('p'):
-                    parts = [x for x in line.split() if x]
-                    self.status = parts
-                    if len(parts) >= 4:
-                        self.n = int(parts[2])
-                        self.m = int(parts[3])
-                    continue
-
-                clause = [int(x) for x in line.split() if int(x) != 0]
-                if clause:
-                    self.clauses.append(clause)
+            # 串流讀檔 (支援 .gz/.xz/.bz2), 子句直接存入 ClauseDB
+            if self.cache_dir is not None:
+                self.status, self.n, self.m, self.clauses, self.parse_stats = read_dimacs_cached(file_path, self.cache_dir)
+            else:
+                self.status, self.n, self.m, self.clauses, self.parse_stats = read_dimacs(file_path)
 
         except FileNotFoundError:
             print(f"[Error] 檔案不存在：{file_path}")
+        except MemoryError: # 不能當成空公式繼續解 (批次執行時要記為 MEMOUT)
+            raise
+        except OSError as e:
+            if e.errno == errno.ENOMEM: # mmap 超過記憶體上限時是 OSError 而不是 MemoryError
+                raise MemoryError(str(e)) from e
+            print(f"[Error] 發生錯誤：{e}")
         except Exception as e:
             print(f"[Error] 發生錯誤：{e}")
 
@@ -50,42 +87,78 @@ class Solver:
         print(f"變數數量 (n): {self.n}")
         print(f"子句數量 (m): {self.m}")
         print(f"前5個子句 (clauses): {self.clauses[:5]}")
+        if self.parse_stats:
+            st = self.parse_stats
+            print(f"讀檔: {st['bytes']} bytes, {st['seconds']:.3f} 秒 ({st['MB/s']:.1f} MB/s, {st['clauses/s']:.0f} clauses/s)" + (f", cache {st['cache']}" if "cache" in st else ""))
 
     # =====================================
     # 找滿足解的主要 function
     # =====================================
-    def find_satisfying_assignments(self, verbose=False):
+    def find_satisfying_assignments(self, verbose=False, max_nodes = None, max_seconds = None, max_memory = None, checkpoint = None):
+        # max_nodes / max_seconds / max_memory (bytes, 以 process 的最大 RSS 計) 為本次執行的預算,
+        # 用完時停止並回傳 status = "UNKNOWN"; 有給 checkpoint 檔名時會把搜尋前緣寫入檔案, 下次從該處續跑
         start_time = datetime.now()  # 開始計算時間
-        self.F = self._initialize_obj(self.n, self.clauses)
-
-        if verbose:
+        clauses = self.clauses
+        pre = None
+        if self.preprocessing: # 在化簡後的公式上搜尋, 找到的解再還原成原本變數的解
+            pre = Preprocessor(self.n, self.clauses)
+            clauses = pre.run()
+            self.preprocess_stats = pre.stats
+        budgeted = not (max_nodes is None and max_seconds is None and max_memory is None and checkpoint is None)
+        if self.decompose and budgeted:
+            raise ValueError("decompose 不支援預算限制 / checkpoint")
+        if checkpoint is not None and self.propagation == "learning": # 學到的子句不在 checkpoint 中, 重播時的傳遞與順序會不同
+            raise ValueError("propagation 為 \"learning\" 時不支援 checkpoint")
+        if checkpoint is not None and self.file_name is None: # checkpoint 以檔案內容驗證是否為同一個 instance
+            raise ValueError("checkpoint 需要由檔案讀入的公式 (from_clauses 建立的 Solver 不支援)")
+        if not self.decompose:
+            self.F = self._initialize_obj(self.n, clauses)
+            if pre is not None and self.search_stats is not None:
+                self.search_stats.add_time("preprocess", pre.stats["seconds"])
+
+        if verbose and not self.decompose:
             print(f"[初始化資訊]")
-            print(f"clauses = {self.F['clauses']}")
-            print(f"pq = {self.F['pq']}")
-            print(f"x = {self.F['x']}")
-            print(f"touched_cnt = {self.F['touched_cnt']}")
-            print(f"invalid = {self.F['invalid']}")
+            print(f"clauses = {self.F.clauses}")
+            print(f"pq = {self.F.pq}")
+            print(f"x = {[(self.F.clauses.pos_occ(v).tolist(), self.F.clauses.neg_occ(v).tolist()) for v in range(self.n + 1)]}")
+            print(f"touched_cnt = {self.F.touched_cnt}")
+            print(f"invalid = {self.F.invalid.tolist()}")
             print()
 
-        shoot = set()
         ans = []
         self.dfs_counter = 0
 
 
         # 找 minimal (含多餘)
-        # self._dfs(shoot, set(), ans, verbose) #H_1
-        # self._dfs1(shoot, set(), ans, set(), verbose) #H_1^'
-        # self._dfs1(shoot, set(), ans, set(), verbose) #H_1.1^' (此版只是優化部分結構)
-        # self._dfs2(shoot, set(), ans, set(), verbose) #H_1^''
-        # self._dfs3(shoot, set(), ans, set(), verbose) #H_1.1^''
+        # self._dfs(ans, verbose) #H_1
+        # self._dfs1(ans, verbose) #H_1^'
+        # self._dfs1(ans, verbose) #H_1.1^' (此版只是優化部分結構)
+        # self._dfs2(ans, verbose) #H_1^''
+        # self._dfs3(ans, verbose) #H_1.1^''
 
 
         # 純找解 or 不可滿足
-        # self._dfs(shoot, set(), ans, verbose) #H_1
-        # self._dfs1(shoot, set(), ans, set(), verbose) #H_1^'
-        # self._dfs1(shoot, set(), ans, set(), verbose) #H_1.1^' (此版只是優化部分結構)
-        # self._dfs2(shoot, set(), ans, set(), verbose) #H_1^''
-        self._dfs3(shoot, set(), ans, set(), verbose, True) #H_1.1^''
+        # self._dfs(ans, verbose) #H_1
+        # self._dfs1(ans, verbose) #H_1^'
+        # self._dfs1(ans, verbose) #H_1.1^' (此版只是優化部分結構)
+        # self._dfs2(ans, verbose) #H_1^''
+        budget = None
+        search_start = time.perf_counter()
+        if pre is not None and pre.unsat: # 前處理就得到空子句
+            pass
+        elif self.decompose: # 每個 component 各自搜尋, 解為各 component 解的聯集
+            ans = self._solve_components(clauses, True, verbose, self.decompose_jobs)
+        elif not budgeted:
+            self._dfs3(ans, verbose, True) #H_1.1^''
+        else:
+            budget = self._budgeted3(ans, verbose, max_nodes, max_seconds, max_memory, checkpoint)
+        if not self.decompose:
+            ans = [unpack(x) for x in ans] # 搜尋中的解存成 bit mask
+        stats = self.search_stats if not self.decompose else None
+        if stats is not None:
+            stats.add_time("search", time.perf_counter() - search_start)
+        if pre is not None:
+            ans = [pre.reconstruct(x) for x in ans]
 
 
         # 計算總時間
@@ -111,23 +184,325 @@ class Solver:
         # }
         return {
             "satisfying_assignments": ans,  # 滿足解
-            "dfs_counter": self.dfs_counter,  # dfs呼叫次數
+            "dfs_counter": self.dfs_counter,  # dfs呼叫次數 (續跑時包含之前的次數)
             "elapsed_time": elapsed_time,  # 花費的時間
+            "status": "UNKNOWN" if budget is not None else ("sat" if ans else "unsat"),
+            "budget": budget,  # 用完的預算 ("nodes" / "time" / "memory"), 沒有則為 None
+            "stats": stats.as_dict() if stats is not None else None,  # 搜尋統計 (collect_stats 為 True 時)
         }
 
+    # =====================================
+    # 有預算限制 / checkpoint 的 H_1.1'' 搜尋
+    # =====================================
+    def _budgeted3(self, ans : list, verbose, max_nodes, max_seconds, max_memory, checkpoint) -> str:
+        # 回傳用完的預算 ("nodes" / "time" / "memory"), 搜尋結束則回傳 None
+        file_path = state = None
+        settings = {"propagation": self.propagation, "preprocessing": self.preprocessing} # 會改變搜尋順序的設定
+        if checkpoint is not None: # 只有 checkpoint 需要檔案路徑 (from_clauses 沒有 file_name)
+            file_path = os.path.join(self.path, self.file_name)
+            state = ckpt.load(checkpoint, file_path, settings)
+        if state is not None:
+            if self._resume3(state, ans, verbose):
+                print(f"[續跑] 從 checkpoint 繼續, 已搜尋 {self.dfs_counter} 個節點")
+            else: # 重播走不到記錄的節點, 不能接著已結束的搜尋回傳 unsat
+                print(f"[Warning] checkpoint 的搜尋前緣無法重播, 重新開始：{checkpoint}")
+                self.F = self._initialize_obj(self.n, self.F.clauses)
+                self.dfs_counter = 0
+                ans.clear()
+                state = None
+        if state is None:
+            self._start3()
+
+        start = time.perf_counter()
+        base = self.dfs_counter
+        slice_nodes = None if max_seconds is None and max_memory is None else 1024 # 每隔多少節點檢查時間與記憶體
+        budget = None
+        while True:
+            step = slice_nodes
+            if max_nodes is not None:
+                remain = base + max_nodes - self.dfs_counter
+                if remain <= 0:
+                    budget = "nodes"
+                    break
+                step = remain if step is None else min(step, remain)
+            if self._run3(ans, verbose, True, step) or ans: # 剛好在用完節點預算時找到解也算結束
+                break
+            if max_seconds is not None and time.perf_counter() - start >= max_seconds:
+                budget = "time"
+                break
+            if max_memory is not None and self._max_rss() >= max_memory:
+                budget = "memory"
+                break
+
+        if checkpoint is not None:
+            if budget is None or not self.F.search["stack"]: # 搜尋結束 (或還沒開始) 就不需要 checkpoint
+                ckpt.remove(checkpoint)
+            else:
+                path, top = self._frontier3()
+                ckpt.save(checkpoint, file_path, settings, {"path": path, "top": top, "dfs_counter": self.dfs_counter})
+        return budget
+
+    def _frontier3(self) -> tuple:
+        # 目前的搜尋前緣: 根到最深節點的分支變數, 以及最深節點已經處理到第幾個分支
+        stack = self.F.search["stack"]
+        return [f[2] for f in stack[:-1]], stack[-1][1]
+
+    def _resume3(self, state : dict, ans : list, verbose=False) -> bool:
+        # 沿 checkpoint 的 path 重播回最深的節點, 再把已處理過的分支放入 shoot
+        # 回傳 False 代表 path 與目前的搜尋樹不符 (分支變數不在該層的順序中、途中被剪枝或 top 超出範圍)
+        try:
+            if not self._replay3(state["path"], ans, verbose, True, False):
+                return False
+        except ValueError: # order.index(var): 該層的順序中沒有這個分支變數
+            return False
+        frame = self.F.search["stack"][-1]
+        if state["top"] > len(frame[0]):
+            return False
+        for v in frame[0][:state["top"]]:
+            self.F.trail.shoot(v)
+        frame[1] = state["top"]
+        frame[2] = None
+        self.dfs_counter = state["dfs_counter"]
+        if self.progress is not None:
+            self.progress.start(self.dfs_counter)
+        return True
+
+    def _max_rss(self) -> int:
+        # process 目前為止的最大 RSS (bytes); 無法取得時回傳 0
+        if resource is None:
+            return 0
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024 # macOS 單位為 bytes, Linux 為 KB
+
+    # =====================================
+    # 逐一產生滿足解 (H_1.1'' 列舉模式)
+    # =====================================
+    def iter_solutions(self, limit = None, verbose=False, slice_nodes = 64):
+        # 每找到一個 minimal 解就 yield (set), 不會累積在 list 中; limit 為最多產生幾個解
+        # 搜尋以 slice_nodes 個節點為單位暫停, 呼叫端停止迭代時搜尋就停在原處
+        self.F = self._initialize_obj(self.n, self.clauses)
+        self.dfs_counter = 0
+        self._start3()
+        ans = []
+        count = 0
+        done = False
+        while not done:
+            done = self._run3(ans, verbose, False, slice_nodes)
+            for sol in ans:
+                yield unpack(sol)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            ans.clear()
+
+    # =====================================
+    # Connected component 分解後求解
+    # =====================================
+    def solve_components(self, findOneOrNoSols = False, jobs = 1, limit = None, true_vars = (), false_vars = (), verbose=False) -> list:
+        # 各 component 分別以 H_1.1'' 搜尋, 列舉時回傳各 component 解的 Cartesian product (最多 limit 個)
+        # 給 true_vars / false_vars 時先固定這些變數 (決策之後的分解), 回傳的解包含 true_vars
+        return self._solve_components(self.clauses, findOneOrNoSols, verbose, jobs, limit, true_vars, false_vars)
+
+    def _solve_components(self, clauses, findOneOrNoSols, verbose=False, jobs = 1, limit = None, true_vars = (), false_vars = ()) -> list:
+        self.dfs_counter = 0
+        comps = split_components(clauses, true_vars, false_vars)
+        if comps is None: # 固定的變數使某個子句為 false
+            self.components = []
+            return []
+        self.components = [len(comp_vars) for comp_vars, _ in comps]
+        if verbose:
+            print(f"[分解] {len(comps)} 個 component, 變數數 {self.components}")
+
+        tasks = [(comp_vars, comp, self.propagation, findOneOrNoSols) for comp_vars, comp in comps]
+        results = []
+        if jobs > 1 and len(tasks) > 1:
+            with mp.get_context().Pool(min(jobs, len(tasks))) as pool:
+                for sols, dfs in pool.imap_unordered(solve_component, tasks):
+                    self.dfs_counter += dfs
+                    results.append(sols)
+                    if not sols: # 有一個 component 不可滿足就結束 (with 結束時 terminate 其餘的)
+                        return []
+        else:
+            for task in tasks:
+                sols, dfs = solve_component(task)
+                self.dfs_counter += dfs
+                if not sols:
+                    return []
+                results.append(sols)
+
+        base = set(true_vars)
+        return [base.union(*combo) for combo in itertools.islice(itertools.product(*results), limit)]
+
+    # =====================================
+    # 增量求解: add_clause + solve(assumptions)
+    # =====================================
+    # solve() 使用同一份 F (occurrence list / 權重表 / 學到的子句), 每次查詢都包在一個 trail level 中,
+    # 查詢結束時回溯回根, 下一次查詢只需要搜尋; add_clause 的新子句在下一次 solve 時才併入 F。
+    def add_clause(self, lits) -> int:
+        # 回傳新子句的 id
+        return self.add_clauses([lits])[0]
+
+    def add_clauses(self, clauses) -> list:
+        db = self.clauses
+        for F in (getattr(self, "F", None), self.F_incremental):
+            if F is not None and F.clauses is db:
+                F.batch = None # 釋放 numpy view, ClauseDB 的 array 才能變長
+        cids = []
+        for lits in clauses:
+            clause = list(dict.fromkeys(lits))
+            if not clause:
+                raise ValueError("不能加入空子句")
+            cids.append(len(db))
+            db.append(clause)
+        db.build_occurrences()
+        self.n = db.n
+        self.m = len(db)
+        return cids
+
+    def solve(self, assumptions = (), verbose=False, findOneOrNoSols = True, minimize_failed = False) -> dict:
+        # assumptions 為 literal list (v 代表 v = 1, -v 代表 v = 0), 只在本次查詢有效
+        # 不可滿足時 failed_assumptions 為其中足以造成不可滿足的子集 ([] 代表公式本身不可滿足):
+        #   assumption 傳遞時就衝突 -> 到衝突為止的 assumption (propagation 為 "learning" 時只取衝突子句用到的)
+        #   由搜尋證明不可滿足 -> 所有變數出現在子句中的 assumption (通常不是 minimal)
+        # minimize_failed 為 True 時再逐一嘗試拿掉 (每個 assumption 多一次搜尋) 得到 minimal 的子集
+        start_time = datetime.now()
+        self.F = self._incremental_obj()
+        self.F.stats = self.search_stats = SearchStats() if self.collect_stats else None
+        self.dfs_counter = 0
+        assumptions = list(assumptions)
+        for lit in assumptions:
+            if lit == 0 or abs(lit) > self.n:
+                raise ValueError(f"assumption 的變數超出範圍: {lit}")
+        ans = []
+        search_start = time.perf_counter()
+        failed = self._solve3(assumptions, ans, verbose, findOneOrNoSols)
+        if failed and minimize_failed:
+            for lit in list(failed):
+                trial = [l for l in failed if l != lit]
+                core = self._solve3(trial, [], False, True)
+                if core is not None:
+                    failed = core
+        stats = self.search_stats
+        if stats is not None:
+            stats.add_time("search", time.perf_counter() - search_start)
+        return {
+            "satisfying_assignments": [unpack(x) for x in ans],  # 滿足解 (包含值為 1 的 assumption)
+            "dfs_counter": self.dfs_counter,  # dfs呼叫次數 (含 minimize_failed 的搜尋)
+            "elapsed_time": datetime.now() - start_time,
+            "status": "sat" if failed is None else "unsat",
+            "failed_assumptions": failed if failed is not None else [], # minimize_failed 為 False 時通常不是 minimal (見上面的說明)
+            "stats": stats.as_dict() if stats is not None else None,
+        }
+
+    def _incremental_obj(self):
+        db = self.clauses
+        F = self.F_incremental
+        if F is None or F.clauses is not db or db.n != len(F.touched_cnt) - 1: # 變數變多就重建
+            F = self.F_incremental = self._initialize_obj(self.n, db)
+        elif len(db) > len(F.invalid):
+            self._extend_obj(F, len(F.invalid))
+        return F
+
+    def _extend_obj(self, F : SearchState, first : int):
+        # 把 id >= first 的新子句併入 F (此時已回溯到根, 沒有任何設定)
+        db = F.clauses
+        counters = F.counters
+        counters.extend(first)
+        pq = F.pq
+        pq.grow(len(db))
+        F.pos_lits.extend([None] * (len(db) - first))
+        for cid in range(first, len(db)):
+            clause = db[cid]
+            neg = sum(1 for var in clause if var < 0)
+            weight = -(len(clause) - neg) + 3 * neg
+            F.invalid.append(weight)
+            pq.push(cid, weight)
+        F.batch = BatchWeights(db, counters) if BatchWeights.available else None
+        if F.watch is not None: # 原本子句的 id 在學到的子句之前, watch 需重建
+            F.watch = WatchedLiterals(db, counters.value)
+            if F.learn is not None:
+                F.learn = F.learn.transfer(F.watch)
+
+    def _solve3(self, assumptions : list, ans : list, verbose=False, findOneOrNoSols = True):
+        # 在 assumptions 下以 H_1.1'' 搜尋; 有解回傳 None, 否則回傳 failed assumptions
+        trail = self.F.trail
+        self._start3()
+        level = trail.new_level()
+        failed = self._assume3(assumptions)
+        if failed is None:
+            self._run3(ans, verbose, findOneOrNoSols)
+            if not ans: # 搜尋 (shoot / 權重剪枝) 不是 resolution 證明, 無法找出衝突的來源; 只能排除沒有出現在子句中的 assumption
+                db = self.F.clauses
+                failed = [l for l in assumptions if len(db.occ(abs(l)))]
+        trail.backtrack_to(level)
+        self.F.search = None
+        return failed
+
+    def _assume3(self, assumptions : list):
+        # 依序設定 assumption 並做 unit clause 傳遞; 發生衝突時回傳到目前為止的 assumption, 否則回傳 None
+        learn = self.F.learn
+        trail = self.F.trail
+        value = self.F.counters.value
+        for i, lit in enumerate(assumptions):
+            var = abs(lit)
+            if value[var] & (FORCED if lit > 0 else TRUE):
+                return assumptions[:i + 1]
+            if value[var] & (TRUE if lit > 0 else FORCED):
+                continue
+            if learn is not None:
+                learn.set_reason(var, -1, 0)
+                learn.last = None
+            if lit > 0:
+                trail.assign(lit)
+            else:
+                trail.force(lit)
+            possible = self.F.watch is None or self._watch3(-lit)
+            if not possible and learn is not None and learn.last is not None:
+                # watched literal 衝突: 學到的子句被公式蘊含, 若其中的決策都是 assumption, 這些 assumption 就已經不可滿足
+                core = {-l for l in learn.last}
+                if core <= set(assumptions[:i + 1]):
+                    return [l for l in assumptions[:i + 1] if l in core]
+            possible = possible and self._reweight3(set(self.F.clauses.occ(var)))
+            if not (possible and self._units3()):
+                return assumptions[:i + 1]
+        return None
+
+    # =====================================
+    # 以指定的 heuristic 搜尋 (portfolio 用)
+    # =====================================
+    HEURISTICS = ("H_1", "H_1'", "H_1''", "H_1.1''")
+
+    def run_heuristic(self, heuristic : str, verbose=False, findOneOrNoSols = True) -> list:
+        self.F = self._initialize_obj(self.n, self.clauses)
+        self.dfs_counter = 0
+        ans = []
+        start = time.perf_counter()
+        if heuristic == "H_1":
+            self._dfs(ans, verbose, findOneOrNoSols)
+        elif heuristic == "H_1'":
+            self._dfs1(ans, verbose, findOneOrNoSols)
+        elif heuristic == "H_1''":
+            self._dfs2(ans, verbose, findOneOrNoSols)
+        elif heuristic == "H_1.1''":
+            self._dfs3(ans, verbose, findOneOrNoSols)
+        else:
+            raise ValueError(f"未知的 heuristic: {heuristic}")
+        if self.search_stats is not None:
+            self.search_stats.add_time("search", time.perf_counter() - start)
+        return [unpack(x) for x in ans]
+
     # =====================================
     # 初始化 F 結構
     # =====================================
     def _initialize_obj(self, n : int, clauses : list):
-        pq = []
-        x = [[] for _ in range(n + 1)]
-        touched_cnt = [0] * (n + 1)
-        invalid = {}
+        # 子句存成扁平的 ClauseDB, 並建立正/負 occurrence index
+        start_time = time.perf_counter()
+        self.search_stats = SearchStats() if self.collect_stats else None
+        db = clauses if isinstance(clauses, ClauseDB) else ClauseDB(n, clauses)
+        touched_cnt = [0] * (db.n + 1)
+        invalid = array('q', bytes(8 * len(db))) # 以 cid 為 index 的權重表
         
-        for i, clause in enumerate(clauses):
-            for var in clause:
-                x[abs(var)].append(i)
-
+        for i, clause in enumerate(db):
             neg = sum(1 for var in clause if var < 0)
             
             # H_1 init
@@ -144,16 +519,22 @@ class Solver:
 
             #H_1^' init
             weight = -(len(clause) - neg) + 3 * neg
-            heapq.heappush(pq, (weight, i))
             invalid[i] = weight
 
-        return {
-            "pq": pq,
-            "x": x,
-            "touched_cnt": touched_cnt,
-            "clauses": clauses,
-            "invalid": invalid
-        }
+        pq = IndexedHeap(len(db), invalid)
+        counters = ClauseCounters(db, touched_cnt)
+        watch = WatchedLiterals(db, counters.value) if self.propagation in ("watched", "learning") else None
+        if self.search_stats is not None:
+            self.search_stats.add_time("init", time.perf_counter() - start_time)
+
+        return SearchState(
+            db, invalid, pq, touched_cnt, counters,
+            BatchWeights(db, counters) if BatchWeights.available else None, # 向量化批次計算 (需要 numpy)
+            watch, # watched literal 傳遞
+            ClauseLearner(watch, db.n) if self.propagation == "learning" else None, # 衝突學習
+            self.search_stats, # 搜尋統計 (關閉時為 None)
+            Trail(pq, invalid, touched_cnt, counters), # 回溯用
+        )
 
     def check_solution(self, sols : list, verbose=False):
         clauses = self.clauses
@@ -171,9 +552,9 @@ class Solver:
                         break
 
                 if not satisfied:
-                    error_details.append({"clause_id": cid, "clause": clause, "solution": sol})
+                    error_details.append({"clause_id": cid, "clause": list(clause), "solution": sol})
                     if verbose:
-                        print(f"❌ 子句 {cid} 不滿足！子句內容：{clause}，解為：{sol}")
+                        print(f"❌ 子句 {cid} 不滿足！子句內容：{list(clause)}，解為：{sol}")
                     return error_details  # 找到錯誤就停止檢查
 
         if verbose:
@@ -192,22 +573,22 @@ class Solver:
     # nc = negtive clause                                                   ######      ######    #
     # ec = empty clause                                                     ######      ######  #####
     # sc = satisfied clause
-    def _weight_counting(self, clause_id : int, ans : set): #H_1
+    def _weight_counting(self, clause_id : int, value : bytearray): #H_1
         pos = 0
         untouched_pos = 0
         neg = 0
-        c = self.F["clauses"][clause_id]
+        c = self.F.clauses[clause_id]
         base = -3 + len(c) # defect = k - # of literal in c
 
         for var in c:
             if var > 0:
-                if var in ans: # 當前子句被消除
+                if value[var] & TRUE: # 當前子句被消除
                     return 3
-                if self.F["touched_cnt"][var] == 0: # 沒被碰到的權重加一
+                if self.F.touched_cnt[var] == 0: # 沒被碰到的權重加一
                     untouched_pos += 1
                 pos += 1
             else:
-                if -var not in ans: # 非 positive 的權重設為 1
+                if not value[-var] & TRUE: # 非 positive 的權重設為 1
                     return 1
 
         if pos == 0: # 沒有正變數也不是 non-monotone -> empty clause
@@ -215,95 +596,84 @@ class Solver:
 
         return base - untouched_pos
         
-    def _dfs(self, shoot : set, tmp_ans : set, ans : list,verbose=False): #H_1
+    def _dfs(self, ans : list,verbose=False, findOneOrNoSols = False): #H_1
         self.dfs_counter += 1
+        trail = self.F.trail
+        value = self.F.counters.value
 
-        if len(self.F["pq"]) == 0:
-            ans.append(copy.deepcopy(tmp_ans))
+        if len(self.F.pq) == 0:
+            ans.append(pack(value))
             if verbose:
-                print(f"[找到解] {tmp_ans}")
+                print(f"[找到解] {true_vars(value)}")
             return
 
-        cur_weight, cur_id = heapq.heappop(self.F["pq"])
+        cur_weight, cur_id = trail.pop()
 
         if verbose:
-            print(f"[展開子句] id = {cur_id}, 子句 = {self.F['clauses'][cur_id]}")
+            print(f"[展開子句] id = {cur_id}, 子句 = {self.F.clauses[cur_id]}")
 
         if cur_weight == 1:
-            ans.append(copy.deepcopy(tmp_ans))
+            ans.append(pack(value))
             if verbose:
-                print(f"[早停解] {tmp_ans}")
+                print(f"[早停解] {true_vars(value)}")
             return
 
-        for var in self.F["clauses"][cur_id]:
+        for var in self.F.clauses[cur_id]:
             if var > 0:
-                self.F["touched_cnt"][var] += 1
+                trail.touch(var)
 
-        origin_pq = copy.deepcopy(self.F["pq"])
-        local_shoot = copy.deepcopy(shoot)
-
-        cur_vars = {var for var in self.F["clauses"][cur_id] if var > 0}
+        cur_vars = {var for var in self.F.clauses[cur_id] if var > 0}
         touched_ids = set()
 
         for var in cur_vars:
             if verbose:
-                print(f"{var} {self.F["x"][var]}")
-            touched_ids.update(self.F["x"][var])
+                print(f"{var} {self.F.clauses.occ(var).tolist()}")
+            touched_ids.update(self.F.clauses.occ(var))
 
-        # 保存 touched_cnt 的原始值，以便後續恢復
-        touched_cnt_backup = copy.deepcopy(self.F["touched_cnt"])
+        # 節點層: 記錄 shoot 的變化, 離開節點時恢復
+        trail.new_level()
 
         for var in cur_vars:
-            if var in local_shoot:
+            if value[var] & SHOOT:
                 continue
 
-            tmp_ans.add(var)
+            # 分支層: 記錄這個分支的所有變化
+            trail.new_level()
+            trail.assign(var)
 
-            log = {}
             possible = True
 
             for cid in touched_ids:
-                if var not in self.F["clauses"][cid] and -var not in self.F["clauses"][cid]:
+                if var not in self.F.clauses[cid] and -var not in self.F.clauses[cid]:
                     continue
 
-                new_weight = self._weight_counting(cid, tmp_ans)
+                new_weight = self._weight_counting(cid, value)
                 if verbose:
                     print(f"{cid} {new_weight}")
                 if new_weight == 2: # ec
                     possible = False
                     break
 
-                if self.F["invalid"][cid] != new_weight:
-                    log[cid] = self.F["invalid"][cid]
-                    self.F["invalid"][cid] = new_weight
-
-                    if new_weight != 3:
-                        heapq.heappush(self.F["pq"], (new_weight, cid))
+                if self.F.invalid[cid] != new_weight:
+                    trail.set_weight(cid, new_weight, new_weight != 3)
 
             if verbose:
-                print(f"嘗試 var = {var}，pq 變為：{self.F['pq']}")
+                print(f"嘗試 var = {var}，pq 變為：{self.F.pq}")
 
             if possible:
-                while self.F["pq"]:
-                    tmp = heapq.heappop(self.F["pq"])
-                    if tmp[0] == self.F["invalid"][tmp[1]]:
-                        heapq.heappush(self.F["pq"], tmp)
-                        break
-                self._dfs(local_shoot, tmp_ans, ans, verbose)
+                self._dfs(ans, verbose, findOneOrNoSols)
+                #find one and return immediately
+                if findOneOrNoSols and len(ans) != 0:
+                    return
 
-            # 恢復 invalid table
-            for cid, old_weight in log.items():
-                self.F["invalid"][cid] = old_weight
+            # 恢復 tmp_ans, invalid table, pq, touched_cnt
+            trail.backtrack()
 
-            # 恢復 pq
-            self.F["pq"] = copy.deepcopy(origin_pq)
+            # 已探索過的 var 放入 shoot
+            trail.shoot(var)
 
-            # 恢復 touched_cnt
-            self.F["touched_cnt"] = copy.deepcopy(touched_cnt_backup)
-
-            # 恢復 tmp_ans 和 local_shoot
-            tmp_ans.remove(var)
-            local_shoot.add(var)
+        # 恢復 shoot
+        trail.backtrack()
     #########################################################################################
     #########################################################################################
     #########################################################################################
@@ -333,8 +703,8 @@ class Solver:
     # nc = negtive clause
     # ec = empty clause
     # sc = satisfied clause
-    def _weight_counting1(self, clause_id : int, ans : set, forced : set, alpha = 4): #H_1^' 計算該clause_id 對應的 clause 在當前配置 (ans, forced) 下的權重
-        c = self.F["clauses"][clause_id]
+    def _weight_counting1(self, clause_id : int, value : bytearray, alpha = 4): #H_1^' 計算該clause_id 對應的 clause 在當前配置 value 下的權重
+        c = self.F.clauses[clause_id]
         l = len(c)
         A = 0 # 尚未觸碰 '正' 變數總量 (type A)
         _A = 0 # 尚未觸碰 '負' 變數總量 (type A)
@@ -344,26 +714,26 @@ class Solver:
         BF = 0 # 已觸碰尚未固定, 但因為存在 unit clause (-B) 使得 B 被強制為 0 的 '正' 變數總量 (type B)
         for var in c:
             if var > 0:
-                if var in ans: # (C 類)
+                if value[var] & TRUE: # (C 類)
                     return 11
-                if self.F["touched_cnt"][var] == 0: # 尚未觸碰 (A 類)
+                if self.F.touched_cnt[var] == 0: # 尚未觸碰 (A 類)
                     A += 1
-                    if -var in forced: # A 被強迫設定為 0
+                    if value[var] & FORCED: # A 被強迫設定為 0
                         AF += 1
                     continue
-                if -var in forced: # 觸碰未固定 (B 類) # B 被強迫設定為 0
+                if value[var] & FORCED: # 觸碰未固定 (B 類) # B 被強迫設定為 0
                     BF += 1
                 
             else:
-                if var in forced: # neg unit clause 
+                if value[-var] & FORCED: # neg unit clause 
                     return 11
-                if -var in ans: #已固定的 neg # (C 類)
+                if value[-var] & TRUE: #已固定的 neg # (C 類)
                     _C += 1
                     continue
-                if self.F["touched_cnt"][-var] == 0: # 尚未觸碰的 neg
+                if self.F.touched_cnt[-var] == 0: # 尚未觸碰的 neg
                     _A += 1
                     continue
-                if self.F["touched_cnt"][-var] != 0: # 已觸碰尚未固定的 neg
+                if self.F.touched_cnt[-var] != 0: # 已觸碰尚未固定的 neg
                     _B += 1
 
         if l == _C + AF + BF: # 三量總和為 l 代表 ec
@@ -371,164 +741,142 @@ class Solver:
         Delta = l - _C
         return -alpha*(Delta - 2)*(Delta - 3) - A + AF + 3*(_A + _B)
 
-    def _dfs1(self, shoot : set, tmp_ans : set, ans : list, forced : set,verbose=False): #H_1^'
+    # 與 _weight_counting1 相同的權重, 但直接讀取 F.counters 的增量計數器, O(1)
+    # (計數器對應目前 trail 上的配置 value / touched_cnt)
+    def _weight_counting1c(self, clause_id : int, alpha = 4):
+        cnt = self.F.counters
+        if cnt.sat[clause_id]: # (C 類) 或 neg unit clause
+            return 11
+        l = cnt.size[clause_id]
+        _C = cnt.C[clause_id]
+        if l == _C + cnt.F0[clause_id]: # ec
+            return 10
+        Delta = l - _C
+        return -alpha*(Delta - 2)*(Delta - 3) - cnt.U[clause_id] + 3*(cnt.nneg[clause_id] - _C)
+
+    def _dfs1(self, ans : list,verbose=False, findOneOrNoSols = False): #H_1^'
         self.dfs_counter += 1
+        trail = self.F.trail
+        value = self.F.counters.value
 
-        if len(self.F["pq"]) == 0:
-            ans.append(copy.deepcopy(tmp_ans))
+        if len(self.F.pq) == 0:
+            ans.append(pack(value))
             if verbose:
-                print(f"[找到解] {tmp_ans}")
+                print(f"[找到解] {true_vars(value)}")
             return
 
-        cur_weight, cur_id = heapq.heappop(self.F["pq"])
+        cur_weight, cur_id = trail.pop()
 
         if verbose:
-            print(f"[展開子句] id = {cur_id}, 子句 = {self.F['clauses'][cur_id]}")
+            print(f"[展開子句] id = {cur_id}, 子句 = {self.F.clauses[cur_id]}")
 
         if cur_weight > 0 and cur_weight < 10:
-            ans.append(copy.deepcopy(tmp_ans))
+            ans.append(pack(value))
             if verbose:
-                print(f"[早停解] {tmp_ans}")
+                print(f"[早停解] {true_vars(value)}")
             return
 
-        for var in self.F["clauses"][cur_id]:
+        for var in self.F.clauses[cur_id]:
             if var > 0:
-                self.F["touched_cnt"][var] += 1
+                trail.touch(var)
 
-        origin_pq = copy.deepcopy(self.F["pq"])
-        local_shoot = copy.deepcopy(shoot)
-        local_forced = copy.deepcopy(forced)
-
-        cur_vars = {var for var in self.F["clauses"][cur_id] if var > 0 and -var not in forced}
+        cur_vars = {var for var in self.F.clauses[cur_id] if var > 0 and not value[var] & FORCED}
         touched_ids = set()
 
         # H1v2 原版沒過濾 就是會花比較多時間
         # for var in cur_vars:
         #     if verbose:
-        #         print(f"{var} {self.F["x"][var]}")
-        #     touched_ids.update(self.F["x"][var])
+        #         print(f"{var} {self.F.clauses.occ(var)}")
+        #     touched_ids.update(self.F.clauses.occ(var))
 
-        # 保存 touched_cnt 的原始值，以便後續恢復
-        touched_cnt_backup = copy.deepcopy(self.F["touched_cnt"])
+        # 節點層: 記錄 shoot 的變化, 離開節點時恢復
+        trail.new_level()
 
         for var in cur_vars:
-            if var in local_shoot:
+            if value[var] & SHOOT:
                 continue
+            # 分支層: 記錄這個分支的所有變化
+            trail.new_level()
             touched_ids = set()
-            touched_ids.update(self.F["x"][var])
-            tmp_ans.add(var)
+            touched_ids.update(self.F.clauses.occ(var))
+            trail.assign(var)
 
-            log = {}
             possible = True
 
             for cid in touched_ids:
-                # if var not in self.F["clauses"][cid] and -var not in self.F["clauses"][cid]:
+                # if var not in self.F.clauses[cid] and -var not in self.F.clauses[cid]:
                 #     continue
 
-                new_weight = self._weight_counting1(cid, tmp_ans, local_forced)
+                new_weight = self._weight_counting1c(cid)
                 if verbose:
                     print(f"{cid} {new_weight}")
                 if new_weight == 10: # ec
                     possible = False
                     break
 
-                if self.F["invalid"][cid] != new_weight:
-                    log[cid] = self.F["invalid"][cid]
-                    self.F["invalid"][cid] = new_weight
-
-                    # if new_weight != 3:
-                    # if new_weight <= 10:
-                    if new_weight <= 0: # uc pc nc
-                        heapq.heappush(self.F["pq"], (new_weight, cid))
+                if self.F.invalid[cid] != new_weight:
+                    trail.set_weight(cid, new_weight, new_weight <= 0) # uc pc nc
 
             if verbose:
-                print(f"嘗試 var = {var}，pq 變為：{self.F['pq']}")
-
-            setting = [] #紀錄 unit clause 內正變數
-            while self.F["pq"] and possible:
-                tmp = heapq.heappop(self.F["pq"])
-                if tmp[0] == self.F["invalid"][tmp[1]]:
-                    if tmp[0] < -3: # unit clause 
-                        for v in self.F["clauses"][tmp[1]]:
-                            if -v not in tmp_ans:
-                                if v in local_shoot: # unit clause 在先前的分支已經探索過了
+                print(f"嘗試 var = {var}，pq 變為：{self.F.pq}")
+
+            while self.F.pq and possible:
+                tmp = self.F.pq.top()
+                if tmp[0] >= -3:
+                    break
+                trail.pop()
+                # unit clause
+                for v in self.F.clauses[tmp[1]]:
+                    if v > 0 or not value[-v] & TRUE:
+                        if v > 0 and value[v] & SHOOT: # unit clause 在先前的分支已經探索過了
+                            possible = False
+                            break
+                        if v > 0: # pos unit clause
+                            touched_ids2 = set()
+                            touched_ids2.update(self.F.clauses.occ(v))
+                            trail.assign(v)
+                            for cid in touched_ids2:
+                                new_weight = self._weight_counting1c(cid)
+
+                                if new_weight == 10: # ec
                                     possible = False
                                     break
-                                if v > 0: # pos unit clause
-                                    touched_ids2 = set()
-                                    touched_ids2.update(self.F["x"][v])
-                                    tmp_ans.add(v)
-                                    setting.append(v)
-                                    for cid in touched_ids2:
-                                        new_weight = self._weight_counting1(cid, tmp_ans, local_forced)
-
-                                        if new_weight == 10: # ec
-                                            possible = False
-                                            break
-
-                                        if self.F["invalid"][cid] != new_weight:
-                                            if cid not in log:
-                                                log[cid] = self.F["invalid"][cid]
-                                            self.F["invalid"][cid] = new_weight
-
-                                            # if new_weight != 3:
-                                            # if new_weight <= 10:
-                                            if new_weight <= 0: # uc pc nc
-                                                heapq.heappush(self.F["pq"], (new_weight, cid))
-                                    if not possible:
-                                        break
-                                else: # neg unit clause
-                                    touched_ids2 = set()
-                                    touched_ids2.update(self.F["x"][-v])
-                                    # local_shoot.add(-v)
-                                    local_forced.add(v)
-                                    for cid in touched_ids2:
-                                        new_weight = self._weight_counting1(cid, tmp_ans, local_forced)
-
-                                        if new_weight == 10: # ec
-                                            possible = False
-                                            break
-
-                                        if self.F["invalid"][cid] != new_weight:
-                                            if cid not in log:
-                                                log[cid] = self.F["invalid"][cid]
-                                            self.F["invalid"][cid] = new_weight
-
-                                            # if new_weight != 3:
-                                            # if new_weight <= 10:
-                                            if new_weight <= 0:
-                                                heapq.heappush(self.F["pq"], (new_weight, cid))
-                                    if not possible:
-                                        break
-                        if not possible:
-                            break
-                    else:
-                        heapq.heappush(self.F["pq"], tmp)
-                        break
-
-            if possible:
-                self._dfs1(local_shoot, tmp_ans, ans, local_forced, verbose)
 
-            # 恢復 pos unit clause 時 tmp_ans 放入的正變數
-            for v in setting:
-                tmp_ans.remove(v)
+                                if self.F.invalid[cid] != new_weight:
+                                    trail.set_weight(cid, new_weight, new_weight <= 0) # uc pc nc
+                            if not possible:
+                                break
+                        else: # neg unit clause
+                            touched_ids2 = set()
+                            touched_ids2.update(self.F.clauses.occ(-v))
+                            # shoot.add(-v)
+                            trail.force(v)
+                            for cid in touched_ids2:
+                                new_weight = self._weight_counting1c(cid)
+
+                                if new_weight == 10: # ec
+                                    possible = False
+                                    break
 
-            # 恢復 local_forced
-            local_forced = copy.deepcopy(forced)
+                                if self.F.invalid[cid] != new_weight:
+                                    trail.set_weight(cid, new_weight, new_weight <= 0)
+                            if not possible:
+                                break
 
-            # 恢復 invalid table
-            for cid, old_weight in log.items():
-                self.F["invalid"][cid] = old_weight
+            if possible:
+                self._dfs1(ans, verbose, findOneOrNoSols)
+                #find one and return immediately
+                if findOneOrNoSols and len(ans) != 0:
+                    return
 
-            # 恢復 pq
-            self.F["pq"] = copy.deepcopy(origin_pq)
+            # 恢復 tmp_ans, forced, invalid table, pq, touched_cnt
+            trail.backtrack()
 
-            # 恢復 touched_cnt
-            self.F["touched_cnt"] = copy.deepcopy(touched_cnt_backup)
+            # 已探索過的 var 放入 shoot
+            trail.shoot(var)
 
-            # 恢復 tmp_ans 和 local_shoot
-            tmp_ans.remove(var)
-            local_shoot.add(var)
+        # 恢復 shoot
+        trail.backtrack()
 
 #########################################################################################
 #########################################################################################
@@ -549,31 +897,26 @@ class Solver:
                                                                     ######      ######       ##  
                                                                     ######      ######     ######
 
-    def process(self, var : set, setTo1 : set, setTo0 : set) -> list:
-        cids = set()
-        s = dict()
-        # all = set()
-        for x in var: # 搜集所有 x 存在的子句, 並初始化 S_x = {}, S_y = {}, S_z = {}
-            cids.update(self.F["x"][x])
-            s[x] = set()
-
-        for cid in cids: # 判斷所有內涵 x -x y -y z -z 是否還存在, 存在則更改 S_x
-            c = self.F["clauses"][cid] #list
-            ig = False # ignore
-            C = set()
-            for l in c:
-                if l in setTo1 or l in setTo0:
-                    ig = True
-                    break
-                C.add(l)
-            if ig : # un-exist
-                continue
-
-            for v in var:
-                if v in C :
+    def process(self, var : set) -> list:
+        # 依 |S_x| 由小到大排列候選變數 x, 其中
+        #   S_x = { y in var, y != x : 某個還沒被滿足的子句正 literal 含 y 但不含 x }
+        # (與逐一重建每個子句的 literal 集合相同的結果)
+        # 子句是否已被目前的配置滿足由 ClauseCounters.sat 增量維護 (Trail 同步更新),
+        # 子句的正 literal 集合為靜態的, 第一次用到時建立後保留
+        db = self.F.clauses
+        sat = self.F.counters.sat
+        pos_lits = self.F.pos_lits
+        s = {x: set() for x in var}
+        for y in var:
+            for cid in db.pos_occ(y):
+                if sat[cid]: # 已被滿足 (un-exist)
                     continue
-                for nv in ((C - {-v}) & var):
-                    s[v].update({abs(nv)})
+                P = pos_lits[cid]
+                if P is None:
+                    P = pos_lits[cid] = frozenset(l for l in db[cid] if l > 0)
+                for x in var:
+                    if x not in P:
+                        s[x].add(y)
 
         S = []
         for [key, SET] in s.items():
@@ -585,54 +928,53 @@ class Solver:
             sorted.append(key)
         return sorted
 
-    def _dfs2(self, shoot : set, tmp_ans : set, ans : list, forced : set,verbose=False): #H_1^''
+    def _dfs2(self, ans : list,verbose=False, findOneOrNoSols = False): #H_1^''
         self.dfs_counter += 1
+        trail = self.F.trail
+        value = self.F.counters.value
 
-        if len(self.F["pq"]) == 0:
-            ans.append(copy.deepcopy(tmp_ans))
+        if len(self.F.pq) == 0:
+            ans.append(pack(value))
             if verbose:
-                print(f"[找到解] {tmp_ans}")
+                print(f"[找到解] {true_vars(value)}")
             return
 
-        cur_weight, cur_id = heapq.heappop(self.F["pq"])
+        cur_weight, cur_id = trail.pop()
 
         if verbose:
-            print(f"[展開子句] id = {cur_id}, 子句 = {self.F['clauses'][cur_id]}")
+            print(f"[展開子句] id = {cur_id}, 子句 = {self.F.clauses[cur_id]}")
 
         if cur_weight > 0 and cur_weight < 10:
-            ans.append(copy.deepcopy(tmp_ans))
+            ans.append(pack(value))
             if verbose:
-                print(f"[早停解] {tmp_ans}")
+                print(f"[早停解] {true_vars(value)}")
             return
 
-        for var in self.F["clauses"][cur_id]:
+        for var in self.F.clauses[cur_id]:
             if var > 0:
-                self.F["touched_cnt"][var] += 1
-
-        origin_pq = copy.deepcopy(self.F["pq"])
-        local_shoot = copy.deepcopy(shoot)
-        local_forced = copy.deepcopy(forced)
+                trail.touch(var)
 
-        cur_vars = {var for var in self.F["clauses"][cur_id] if var > 0 and -var not in forced}
-
-        # 保存 touched_cnt 的原始值，以便後續恢復
-        touched_cnt_backup = copy.deepcopy(self.F["touched_cnt"])
+        cur_vars = {var for var in self.F.clauses[cur_id] if var > 0 and not value[var] & FORCED}
 
         # 給出變數展開順序 sorted : list
-        sorted = self.process(cur_vars, tmp_ans, forced)
+        sorted = self.process(cur_vars)
+
+        # 節點層: 記錄 shoot 的變化, 離開節點時恢復
+        trail.new_level()
 
         for var in sorted:
-            if var in local_shoot:
+            if value[var] & SHOOT:
                 continue
+            # 分支層: 記錄這個分支的所有變化
+            trail.new_level()
             touched_ids = set()
-            touched_ids.update(self.F["x"][var])
-            tmp_ans.add(var)
+            touched_ids.update(self.F.clauses.occ(var))
+            trail.assign(var)
 
-            log = {}
             possible = True
 
             for cid in touched_ids:
-                new_weight = self._weight_counting1(cid, tmp_ans, local_forced)
+                new_weight = self._weight_counting1c(cid)
                 if verbose:
                     print(f"{cid} {new_weight}")
 
@@ -640,96 +982,68 @@ class Solver:
                     possible = False
                     break
 
-                if self.F["invalid"][cid] != new_weight:
-                    log[cid] = self.F["invalid"][cid]
-                    self.F["invalid"][cid] = new_weight
-
-                    if new_weight <= 0: # pc uc
-                        heapq.heappush(self.F["pq"], (new_weight, cid))
+                if self.F.invalid[cid] != new_weight:
+                    trail.set_weight(cid, new_weight, new_weight <= 0) # pc uc
 
             if verbose:
-                print(f"嘗試 var = {var}，pq 變為：{self.F['pq']}")
-
-            setting = [] #紀錄 unit clause 內正變數
-            while self.F["pq"] and possible:
-                tmp = heapq.heappop(self.F["pq"])
-                if tmp[0] == self.F["invalid"][tmp[1]]:
-                    if tmp[0] < -3: # unit clause 
-                        for v in self.F["clauses"][tmp[1]]:
-                            if -v not in tmp_ans:
-                                if v in local_shoot: # unit clause 在先前的分支已經探索過了
+                print(f"嘗試 var = {var}，pq 變為：{self.F.pq}")
+
+            while self.F.pq and possible:
+                tmp = self.F.pq.top()
+                if tmp[0] >= -3:
+                    break
+                trail.pop()
+                # unit clause
+                for v in self.F.clauses[tmp[1]]:
+                    if v > 0 or not value[-v] & TRUE:
+                        if v > 0 and value[v] & SHOOT: # unit clause 在先前的分支已經探索過了
+                            possible = False
+                            break
+                        if v > 0: # pos unit clause
+                            touched_ids2 = set()
+                            touched_ids2.update(self.F.clauses.occ(v))
+                            trail.assign(v)
+                            for cid in touched_ids2:
+                                new_weight = self._weight_counting1c(cid)
+
+                                if new_weight == 10: # ec
                                     possible = False
                                     break
-                                if v > 0: # pos unit clause
-                                    touched_ids2 = set()
-                                    touched_ids2.update(self.F["x"][v])
-                                    tmp_ans.add(v)
-                                    setting.append(v)
-                                    for cid in touched_ids2:
-                                        new_weight = self._weight_counting1(cid, tmp_ans, local_forced)
-
-                                        if new_weight == 10: # ec
-                                            possible = False
-                                            break
-
-                                        if self.F["invalid"][cid] != new_weight:
-                                            if cid not in log:
-                                                log[cid] = self.F["invalid"][cid]
-                                            self.F["invalid"][cid] = new_weight
-
-                                            if new_weight <= 0: # uc pc
-                                                heapq.heappush(self.F["pq"], (new_weight, cid))
-                                    if not possible:
-                                        break
-                                else: # neg unit clause
-                                    touched_ids2 = set()
-                                    touched_ids2.update(self.F["x"][-v])
-                                    local_forced.add(v)
-                                    for cid in touched_ids2:
-                                        new_weight = self._weight_counting1(cid, tmp_ans, local_forced)
-
-                                        if new_weight == 10: # ec
-                                            possible = False
-                                            break
-
-                                        if self.F["invalid"][cid] != new_weight:
-                                            if cid not in log:
-                                                log[cid] = self.F["invalid"][cid]
-                                            self.F["invalid"][cid] = new_weight
-
-                                            if new_weight <= 0:
-                                                heapq.heappush(self.F["pq"], (new_weight, cid))
-                                    if not possible:
-                                        break
-                        if not possible:
-                            break
-                    else:
-                        heapq.heappush(self.F["pq"], tmp)
-                        break
-
-            if possible:
-                self._dfs2(local_shoot, tmp_ans, ans, local_forced, verbose)
 
-            # 恢復 pos unit clause 時 tmp_ans 放入的正變數
-            for v in setting:
-                tmp_ans.remove(v)
+                                if self.F.invalid[cid] != new_weight:
+                                    trail.set_weight(cid, new_weight, new_weight <= 0) # uc pc
+                            if not possible:
+                                break
+                        else: # neg unit clause
+                            touched_ids2 = set()
+                            touched_ids2.update(self.F.clauses.occ(-v))
+                            trail.force(v)
+                            for cid in touched_ids2:
+                                new_weight = self._weight_counting1c(cid)
+
+                                if new_weight == 10: # ec
+                                    possible = False
+                                    break
 
-            # 恢復 local_forced
-            local_forced = copy.deepcopy(forced)
+                                if self.F.invalid[cid] != new_weight:
+                                    trail.set_weight(cid, new_weight, new_weight <= 0)
+                            if not possible:
+                                break
 
-            # 恢復 invalid table
-            for cid, old_weight in log.items():
-                self.F["invalid"][cid] = old_weight
+            if possible:
+                self._dfs2(ans, verbose, findOneOrNoSols)
+                #find one and return immediately
+                if findOneOrNoSols and len(ans) != 0:
+                    return
 
-            # 恢復 pq
-            self.F["pq"] = copy.deepcopy(origin_pq)
+            # 恢復 tmp_ans, forced, invalid table, pq, touched_cnt
+            trail.backtrack()
 
-            # 恢復 touched_cnt
-            self.F["touched_cnt"] = copy.deepcopy(touched_cnt_backup)
+            # 已探索過的 var 放入 shoot
+            trail.shoot(var)
 
-            # 恢復 tmp_ans 和 local_shoot
-            tmp_ans.remove(var)
-            local_shoot.add(var)
+        # 恢復 shoot
+        trail.backtrack()
 
 #########################################################################################
 #########################################################################################
@@ -761,16 +1075,16 @@ class Solver:
     # nc = negtive clause
     # ec = empty clause
     # sc = satisfied clause
-    def bonus(self, c : list, shoot : set, setTo0 : set) -> int:
+    def bonus(self, c : list, value : bytearray) -> int:
         bonus = 2
 
         isCand = False
         for l in c:
             if l < 0 :
                 continue
-            if -l in setTo0 :
+            if value[l] & FORCED :
                 continue
-            if l not in shoot :
+            if not value[l] & SHOOT :
                 bonus -= 1
             else :
                 isCand = True
@@ -781,215 +1095,407 @@ class Solver:
         # print(c, bonus)
         return - bonus * 4
 
-    def adjust(self, shoot : set, cids : set, setTo1 : set, setTo0 : set):
+    def adjust(self, cids : set, value : bytearray):
         for cid in cids:
-            weight = self._weight_counting1(cid, setTo1, setTo0, 6)
+            weight = self._weight_counting1(cid, value, 6)
             if weight > 0 : # nc ec sc
                 continue
             # pc
-            c = self.F["clauses"][cid] #list
+            c = self.F.clauses[cid] #list
             
-            new_weight = weight + self.bonus(c, shoot, setTo0)
+            new_weight = weight + self.bonus(c, value)
             # print(c, new_weight)
-            self.F["invalid"][cid] = new_weight
+            self.F.invalid[cid] = new_weight
             if new_weight <= 0:
-                heapq.heappush(self.F["pq"], (new_weight, cid))
+                self.F.pq.push(cid, new_weight)
+            else:
+                self.F.pq.remove(cid)
         
         return
     
-    def _dfs3(self, shoot : set, tmp_ans : set, ans : list, forced : set,verbose=False, findOneOrNoSols = False): #H_1.1^''
+    # ==============================================
+    #          H_1.1^'' 的 explicit stack 版本
+    # ==============================================
+    # 原本 _dfs3 每展開一個子句就遞迴一次, 改成以 stack 模擬遞迴:
+    #   frame = [order, i, var]
+    #   order : 此節點的變數展開順序 (process 的結果)
+    #   i     : 下一個要嘗試的 order index
+    #   var   : 目前正在探索的分支變數 (None 代表尚未進入任何分支)
+    # 搜尋狀態都放在 self.F.search, 因此可以中途暫停 (max_nodes) 再呼叫 _run3 繼續。
+    # 配置 (tmp_ans / forced / shoot) 在 F.counters.value 中 (見 assignment.py), 由 trail 設定與回溯。
+    def _dfs3(self, ans : list,verbose=False, findOneOrNoSols = False): #H_1.1^''
+        self._start3()
+        self._run3(ans, verbose, findOneOrNoSols)
+
+    def _start3(self):
+        if self.progress is not None:
+            self.progress.start(self.dfs_counter)
+        self.F.search = {
+            "stack": [],
+            "started": False,
+            "done": False,
+        }
+
+    def _run3(self, ans : list, verbose=False, findOneOrNoSols = False, max_nodes = None, cubes = None, depth = 0) -> bool:
+        # 回傳 True 代表搜尋結束, False 代表達到 max_nodes 暫停 (可再呼叫 _run3 繼續)
+        # cubes 不為 None 時只展開到第 depth 層, 該層的節點記錄成子問題放入 cubes 而不往下搜尋
+        S = self.F.search
+        if S["done"]:
+            return True
+        trail = self.F.trail
+        value = self.F.counters.value
+        stack = S["stack"]
+        limit = None if max_nodes is None else self.dfs_counter + max_nodes
+
+        if not S["started"]:
+            S["started"] = True
+            self._enter3(ans, verbose, findOneOrNoSols)
+
+        while stack:
+            if limit is not None and self.dfs_counter >= limit:
+                return False
+
+            if cubes is not None and len(stack) > depth:
+                # 子問題: 根到此節點的分支變數 (worker 以 _replay3 重播, 不需要配置的 snapshot)
+                cubes.append([f[2] for f in stack[:-1]])
+                trail.backtrack()
+                stack.pop()
+                continue
+
+            frame = stack[-1]
+            if frame[2] is not None: # 子節點結束, 回到此分支
+                #find one and return immediately
+                if findOneOrNoSols and len(ans) != 0 :
+                    break
+
+                # 恢復 tmp_ans, forced, invalid table, pq, touched_cnt
+                trail.backtrack()
+
+                # 已探索過的 var 放入 shoot
+                trail.shoot(frame[2])
+                frame[2] = None
+
+                # 調整 pq
+                # self.adjust(touched_ids, value)
+                # print("TSESESE")
+
+            order, i = frame[0], frame[1]
+            while i < len(order) and value[order[i]] & SHOOT:
+                i += 1
+            if i == len(order):
+                # 恢復 shoot
+                trail.backtrack()
+                stack.pop()
+                # print("回朔")
+                continue
+
+            var = order[i]
+            frame[1] = i + 1
+            frame[2] = var
+
+            # 分支層: 記錄這個分支的所有變化
+            trail.new_level()
+            if self._branch3(var, verbose):
+                self._enter3(ans, verbose, findOneOrNoSols)
+
+        S["done"] = True
+        return True
+
+    def _cubes3(self, depth : int, ans : list, verbose=False, findOneOrNoSols = False) -> list:
+        # 把搜尋樹的前 depth 層展開成子問題 (cube-and-conquer 用); 展開途中找到的解放在 ans
+        cubes = []
+        self._start3()
+        self._run3(ans, verbose, findOneOrNoSols, None, cubes, depth)
+        return cubes
+
+    def _replay3(self, path : list, ans : list, verbose=False, findOneOrNoSols = False, subtree = True) -> bool:
+        # 從根沿著 path 的分支變數走到子問題的節點 (較早的兄弟分支依序放入 shoot, 與循序搜尋相同),
+        # subtree 為 True 時之後 _run3 只搜尋這個節點的子樹, False 則保留整個 stack (checkpoint 續跑用)
+        # 回傳 False 代表子問題在途中就結束 (被剪枝或已是葉節點)
+        self._start3()
+        S = self.F.search
+        S["started"] = True
+        trail = self.F.trail
+        value = self.F.counters.value
+        stack = S["stack"]
+
+        self._enter3(ans, verbose, findOneOrNoSols)
+        for var in path:
+            if not stack:
+                S["done"] = True
+                return False
+            frame = stack[-1]
+            order = frame[0]
+            i = order.index(var)
+            for v in order[:i]:
+                trail.shoot(v)
+            if value[var] & SHOOT: # 循序搜尋時這個分支會被略過
+                S["done"] = True
+                return False
+            frame[1] = i + 1
+            frame[2] = var
+
+            trail.new_level()
+            depth = len(stack)
+            if not self._branch3(var, verbose):
+                S["done"] = True
+                return False
+            self._enter3(ans, verbose, findOneOrNoSols)
+            if len(stack) == depth: # 找到解或早停
+                S["done"] = True
+                return False
+
+        # 只保留子問題的節點, 這個子樹搜尋完就結束
+        if subtree:
+            S["stack"] = stack[-1:]
+        return True
+
+    def _split3(self, path : list):
+        # 從目前搜尋中最淺、還有未展開分支的節點切出最後一個分支, 回傳該子問題的 path (沒有可切的回傳 None)
+        # 切出的是最後一個分支, 所以其他尚未展開的分支看到的 shoot 不變
+        stack = self.F.search["stack"]
+        for k, frame in enumerate(stack):
+            order = frame[0]
+            if frame[1] < len(order):
+                frame[0] = order[:-1]
+                return path + [f[2] for f in stack[:k]] + [order[-1]]
+        return None
+
+    def _enter3(self, ans : list, verbose=False, findOneOrNoSols = False):
+        # 進入一個節點 (相當於原本遞迴呼叫 _dfs3 的開頭), 需要展開時把 frame 放上 stack
         self.dfs_counter += 1
+        progress = self.progress
+        if progress is not None and self.dfs_counter >= progress.next_sample:
+            progress.sample(self)
+        trail = self.F.trail
         if findOneOrNoSols and len(ans) != 0:
             return
         
-        if len(self.F["pq"]) == 0:
-            ans.append(copy.deepcopy(tmp_ans))
+        value = self.F.counters.value
+        stats = self.F.stats
+        if len(self.F.pq) == 0:
+            ans.append(pack(value))
+            if stats is not None:
+                stats.bytes_copied += sys.getsizeof(ans[-1])
             if verbose:
-                print(f"[找到解] {tmp_ans}")
+                print(f"[找到解] {true_vars(value)}")
             return
 
-        cur_weight, cur_id = heapq.heappop(self.F["pq"])
+        cur_weight, cur_id = trail.pop()
 
         if verbose:
-            print(f"[展開子句] id = {cur_id}, 子句 = {self.F['clauses'][cur_id]}")
+            print(f"[展開子句] id = {cur_id}, 子句 = {self.F.clauses[cur_id]}")
 
         if cur_weight > 0 and cur_weight < 10:
-            ans.append(copy.deepcopy(tmp_ans))
+            ans.append(pack(value))
+            if stats is not None:
+                stats.bytes_copied += sys.getsizeof(ans[-1])
+                stats.heap_pops += 1
             if verbose:
-                print(f"[早停解] {tmp_ans}")
+                print(f"[早停解] {true_vars(value)}")
                 print(cur_weight, cur_id)
             return
 
-        for var in self.F["clauses"][cur_id]:
+        for var in self.F.clauses[cur_id]:
             if var > 0:
-                self.F["touched_cnt"][var] += 1
-
-        origin_pq = copy.deepcopy(self.F["pq"])
-        local_shoot = copy.deepcopy(shoot)
-        local_forced = copy.deepcopy(forced)
-        invalid_backup = copy.deepcopy(self.F["invalid"])
+                trail.touch(var)
 
-        cur_vars = {var for var in self.F["clauses"][cur_id] if var > 0 and -var not in forced}
-
-        # 保存 touched_cnt 的原始值，以便後續恢復
-        touched_cnt_backup = copy.deepcopy(self.F["touched_cnt"])
+        cur_vars = {var for var in self.F.clauses[cur_id] if var > 0 and not value[var] & FORCED}
 
         # 給出變數展開順序 sorted : list
-        sorted = self.process(cur_vars, tmp_ans, forced)
-
-        for var in sorted:
-            if var in local_shoot:
-                continue
-            # print("*",var)
-            touched_ids = set()
-            touched_ids.update(self.F["x"][var])
-            tmp_ans.add(var)
-
-            log = {}
-            possible = True
-
-            for cid in touched_ids:
-                weight = self._weight_counting1(cid, tmp_ans, local_forced, 6)
-
-                if verbose:
-                    print(f"{cid} {weight}")
+        if stats is None:
+            sorted = self.process(cur_vars)
+        else:
+            stats.heap_pops += 1
+            start = time.perf_counter()
+            sorted = self.process(cur_vars)
+            stats.add_time("process", time.perf_counter() - start)
+
+        # 節點層: 記錄 shoot 的變化, 離開節點時恢復
+        trail.new_level()
+        self.F.search["stack"].append([sorted, 0, None])
+
+    def _branch3(self, var : int, verbose=False) -> bool:
+        # 嘗試 var = 1 並做 unit clause 傳遞, 回傳是否可繼續往下搜尋
+        trail = self.F.trail
+        # print("*",var)
+        learn = self.F.learn
+        touched_ids = set()
+        touched_ids.update(self.F.clauses.occ(var))
+        if learn is not None: # 分支變數是決策
+            learn.set_reason(var, -1, len(self.F.search["stack"]))
+        trail.assign(var)
 
-                if weight == 10: # ec
-                    possible = False
-                    break
-                
-                bonus = 0
-                if weight <= 0 :
-                    bonus = self.bonus(self.F["clauses"][cid], local_shoot ,local_forced)
+        # watched literal 先找衝突, 有衝突就不必重新計算權重
+        possible = self.F.watch is None or self._watch3(-var)
+        possible = possible and self._reweight3(touched_ids, verbose)
 
-                # print(self.F["clauses"][cid], "", weight, " ", bonus)
-                if bonus == -100 :
-                    possible = False
-                    # print("啟動")
-                    break
-                
-                new_weight = weight + bonus
-                if self.F["invalid"][cid] != new_weight :
-                    log[cid] = self.F["invalid"][cid]
-                    self.F["invalid"][cid] = new_weight
+        if verbose:
+            print(f"嘗試 var = {var}，pq 變為：{self.F.pq}")
+
+        return possible and self._units3()
+
+    def _units3(self) -> bool:
+        # 權重的 unit clause 傳遞 (pq 最前面權重 < -8 的子句), 回傳是否可繼續往下搜尋
+        trail = self.F.trail
+        value = self.F.counters.value
+        learn = self.F.learn
+        stats = self.F.stats
+        possible = True
+        while self.F.pq and possible:
+            tmp = self.F.pq.top()
+            if tmp[0] >= -8:
+                break
+            trail.pop()
+            if stats is not None:
+                stats.heap_pops += 1
+            # unit clause
+            for v in self.F.clauses[tmp[1]]:
+                if v > 0 or not value[-v] & TRUE:
+                    if v > 0 and value[v] & FORCED and self.F.watch is not None: # 已被 forced 成 0 的 literal 不再設為 1
+                        continue
+                    if v > 0 and value[v] & SHOOT: # unit clause 在先前的分支已經探索過了
+                        if stats is not None:
+                            stats.conflicts["shoot"] += 1
+                        possible = False
+                        break
+                    new = not value[v] & TRUE if v > 0 else not value[-v] & FORCED # 尚未設定過
+                    if stats is not None and new:
+                        stats.unit_props += 1
+                    if learn is not None and new: # 權重的 unit clause 當成決策
+                        learn.set_reason(abs(v), -1, len(self.F.search["stack"]))
+                    if v > 0: # pos unit clause
+                        touched_ids2 = set()
+                        touched_ids2.update(self.F.clauses.occ(v))
+                        trail.assign(v)
+                    else: # neg unit clause
+                        touched_ids2 = set()
+                        touched_ids2.update(self.F.clauses.occ(-v))
+                        trail.force(v)
+                    if self.F.watch is not None:
+                        possible = self._watch3(-v)
+                    possible = possible and self._reweight3(touched_ids2)
+                    if not possible:
+                        break
 
-                    if new_weight <= 0: # pc uc
-                        heapq.heappush(self.F["pq"], (new_weight, cid))
+        return possible
+
+    def _watch3(self, lit : int) -> bool:
+        # lit 剛變成 false, 以 watched literal 找出因此成為 unit 的子句並把剩下的 literal 設為 true (連鎖傳遞),
+        # 傳遞完沒有衝突才一次重新計算這些新設定變數的子句權重; 有衝突回傳 False
+        watch = self.F.watch
+        learn = self.F.learn
+        trail = self.F.trail
+        value = self.F.counters.value
+        stats = self.F.stats
+        falsified = [lit]
+        units = []
+        assigned = []
+        while falsified:
+            if not watch.falsify(falsified.pop(), units):
+                if stats is not None:
+                    stats.conflicts["watch"] += 1
+                if learn is not None:
+                    learn.learn(watch.conflict)
+                return False
+            while units:
+                v, cid = units.pop()
+                if watch._true(v):
+                    continue
+                if watch._false(v): # reason 子句 cid 已經全部為 false
+                    if stats is not None:
+                        stats.conflicts["watch"] += 1
+                    if learn is not None:
+                        learn.learn(cid)
+                    return False
+                if learn is not None:
+                    learn.set_reason(abs(v), cid, len(self.F.search["stack"]))
+                if v > 0:
+                    if value[v] & SHOOT: # unit clause 在先前的分支已經探索過了
+                        if stats is not None:
+                            stats.conflicts["shoot"] += 1
+                        return False
+                    trail.assign(v)
+                else:
+                    trail.force(v)
+                assigned.append(abs(v))
+                falsified.append(-v)
+
+        if stats is not None:
+            stats.unit_props += len(assigned)
+        cids = set()
+        for v in assigned:
+            cids.update(self.F.clauses.occ(v))
+        return self._reweight3(cids)
+
+    def _reweight3(self, cids : set, verbose=False) -> bool:
+        # 重新計算 cids 的 H_1.1^'' 權重 (含 bonus) 並更新 pq, 遇到 ec 或 bonus == -100 回傳 False
+        # touched 子句很多且有 numpy 時, 改用 BatchWeights 一次算完
+        stats = self.F.stats
+        if stats is not None:
+            stats.weight_evals += len(cids)
+            start = time.perf_counter()
+        if self.F.batch is not None and len(cids) >= self.batch_threshold:
+            return self._reweight3_batch(cids, verbose, stats, start if stats is not None else 0.0)
+
+        trail = self.F.trail
+        counters = self.F.counters
+        for cid in cids:
+            weight = self._weight_counting1c(cid, 6)
 
             if verbose:
-                print(f"嘗試 var = {var}，pq 變為：{self.F['pq']}")
-
-            setting = [] #紀錄 unit clause 內正變數
-            while self.F["pq"] and possible:
-                tmp = heapq.heappop(self.F["pq"])
-                if tmp[0] == self.F["invalid"][tmp[1]]:
-                    if tmp[0] < -8: # unit clause 
-                        for v in self.F["clauses"][tmp[1]]:
-                            if -v not in tmp_ans:
-                                if v in local_shoot: # unit clause 在先前的分支已經探索過了
-                                    possible = False
-                                    break
-                                if v > 0: # pos unit clause
-                                    touched_ids2 = set()
-                                    touched_ids2.update(self.F["x"][v])
-                                    tmp_ans.add(v)
-                                    setting.append(v)
-                                    for cid in touched_ids2:
-                                        weight = self._weight_counting1(cid, tmp_ans, local_forced, 6)
-
-                                        if weight == 10: # ec
-                                            possible = False
-                                            break
-
-                                        bonus = 0
-                                        if weight <= 0 :
-                                            bonus = self.bonus(self.F["clauses"][cid], local_shoot ,local_forced)
-
-                                        if bonus == -100 :
-                                            possible = False
-                                            # print("啟動")
-                                            break
-                                        
-                                        new_weight = weight + bonus
-                                        if self.F["invalid"][cid] != new_weight :
-                                            if cid not in log:
-                                                log[cid] = self.F["invalid"][cid]
-                                            self.F["invalid"][cid] = new_weight
-
-                                            if new_weight <= 0: # uc wupc pc
-                                                heapq.heappush(self.F["pq"], (new_weight, cid))
-                                    if not possible:
-                                        break
-                                else: # neg unit clause
-                                    touched_ids2 = set()
-                                    touched_ids2.update(self.F["x"][-v])
-                                    local_forced.add(v)
-                                    for cid in touched_ids2:
-                                        weight = self._weight_counting1(cid, tmp_ans, local_forced, 6)
-
-                                        if weight == 10: # ec
-                                            possible = False
-                                            break
-
-                                        bonus = 0
-                                        if weight <= 0 :
-                                            bonus = self.bonus(self.F["clauses"][cid], local_shoot ,local_forced)
-
-                                        if bonus == -100 :
-                                            possible = False
-                                            # print("啟動")
-                                            break
-                                        
-                                        new_weight = weight + bonus
-                                        if self.F["invalid"][cid] != new_weight :
-                                            if cid not in log:
-                                                log[cid] = self.F["invalid"][cid]
-                                            self.F["invalid"][cid] = new_weight
-
-                                            if new_weight <= 0: # uc wupc pc
-                                                heapq.heappush(self.F["pq"], (new_weight, cid))
-                                    if not possible:
-                                        break
-                        if not possible:
-                            break
-                    else:
-                        heapq.heappush(self.F["pq"], tmp)
-                        break
-
-            if possible:
-                self._dfs3(local_shoot, tmp_ans, ans, local_forced, verbose, findOneOrNoSols)
+                print(f"{cid} {weight}")
 
-            #find one and return immediately
-            if findOneOrNoSols and len(ans) != 0 :
-                return
+            if weight == 10: # ec
+                if stats is not None:
+                    stats.conflicts["ec"] += 1
+                    stats.add_time("reweight", time.perf_counter() - start)
+                return False
             
-            # 恢復 pos unit clause 時 tmp_ans 放入的正變數
-            for v in setting:
-                tmp_ans.remove(v)
-
-            # 恢復 local_forced
-            local_forced = copy.deepcopy(forced)
-
-            # 恢復 invalid table
-            for cid, old_weight in log.items():
-                self.F["invalid"][cid] = old_weight
-
-            # 恢復 pq
-            self.F["pq"] = copy.deepcopy(origin_pq)
-
-            # 恢復 touched_cnt
-            self.F["touched_cnt"] = copy.deepcopy(touched_cnt_backup)
-
-            # 恢復 tmp_ans 和 local_shoot
-            tmp_ans.remove(var)
-            local_shoot.add(var)
-
-            # 調整 pq
-            # self.adjust(local_shoot, touched_ids, tmp_ans, local_forced)
-            # print("TSESESE")
-
-        self.F["invalid"] = invalid_backup
-        # print("回朔")
+            bonus = 0
+            if weight <= 0 :
+                bonus = counters.bonus(cid) # 等同 self.bonus(self.F.clauses[cid], value), 以增量計數 O(1) 取得
+
+            # print(self.F.clauses[cid], "", weight, " ", bonus)
+            if bonus == -100 :
+                # print("啟動")
+                if stats is not None:
+                    stats.conflicts["bonus"] += 1
+                    stats.add_time("reweight", time.perf_counter() - start)
+                return False
+            
+            new_weight = weight + bonus
+            if self.F.invalid[cid] != new_weight :
+                if stats is not None:
+                    stats.heap_pushes += new_weight <= 0
+                    stats.heap_removes += new_weight > 0 and cid in self.F.pq
+                trail.set_weight(cid, new_weight, new_weight <= 0) # uc wupc pc
+        if stats is not None:
+            stats.add_time("reweight", time.perf_counter() - start)
+        return True
+
+    def _reweight3_batch(self, cids : set, verbose=False, stats = None, start = 0.0) -> bool:
+        batch = self.F.batch
+        res = batch.evaluate(cids, 6)
+        if res is None: # ec 或 bonus == -100
+            if stats is not None:
+                stats.conflicts[batch.conflict] += 1
+                stats.add_time("reweight", time.perf_counter() - start)
+            return False
+
+        trail = self.F.trail
+        invalid = self.F.invalid
+        for cid, new_weight in zip(res[0].tolist(), res[1].tolist()):
+            if verbose:
+                print(f"{cid} {new_weight}")
+            if invalid[cid] != new_weight :
+                if stats is not None:
+                    stats.heap_pushes += new_weight <= 0
+                    stats.heap_removes += new_weight > 0 and cid in self.F.pq
+                trail.set_weight(cid, new_weight, new_weight <= 0) # uc wupc pc
+        if stats is not None:
+            stats.add_time("reweight", time.perf_counter() - start)
+        return True
     #########################################################################################
     #########################################################################################
     #########################################################################################
@@ -1,39 +1,165 @@
 import os
+import sys
+import time
+import signal
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from datetime import timedelta
 from solver2 import Solver
 import excel as xsl
+try:
+    import resource
+except ImportError: # Windows 沒有 resource, 記憶體上限無法檢查
+    resource = None
 
-def run_all_solvers_and_save(path : str, folder_name : str):
-    results = []
+CNF_SUFFIXES = (".cnf", ".cnf.gz", ".cnf.xz", ".cnf.bz2")
+SIGKILL = getattr(signal, "SIGKILL", 9) # Windows 沒有 SIGKILL
+MEMOUT_EXIT = 3 # 子 process 的最大 RSS 超過 memout 時的 exit code
 
-    i_th = 0
-    for file_name in os.listdir(path):
-        # 確保只處理合法的 CNF 檔案
-        if file_name.endswith(".cnf"):
-            i_th += 1
-            solver = Solver(path, file_name)
-            print(f"處理{i_th}-th檔案: {file_name}")
+def solve_one(path : str, file_name : str, cache_dir : str, on_parsed = None) -> dict:
+    # 解一個檔案並回傳一列結果; on_parsed(n, m) 在讀檔完成後呼叫
+    solver = Solver(path, file_name, cache_dir)
+    if on_parsed is not None:
+        on_parsed(solver.n, solver.m)
+
+    # 取得滿足解與執行結果
+    solver_result = solver.find_satisfying_assignments(verbose=False)
+    sols = solver_result["satisfying_assignments"]
+    dfs_calls = solver_result["dfs_counter"]
+    elapsed_time = solver_result["elapsed_time"]
+
+    # 檢查解是否正確
+    errors = solver.check_solution(sols, verbose=False)
+
+    return {
+        "檔名": file_name,
+        "n": solver.n,
+        "m": solver.m,
+        "sat/usat": "sat" if sols else "unsat",
+        "dfs呼叫次數": dfs_calls,
+        "最壞呼叫次數": 2 ** solver.n,
+        "time(hr:min:sec)": elapsed_time,
+        "滿足解": len(sols),
+        "檢驗結果": "錯誤" if errors else "正確"
+    }
+
+def _limit_row(file_name : str, n, m, status : str, seconds : float) -> dict:
+    # TIMEOUT / MEMOUT / ERROR 時的結果列 (欄位與正常結果相同)
+    return {
+        "檔名": file_name,
+        "n": n,
+        "m": m,
+        "sat/usat": status,
+        "dfs呼叫次數": "-",
+        "最壞呼叫次數": 2 ** n if n is not None else "-",
+        "time(hr:min:sec)": str(timedelta(seconds=int(seconds))),
+        "滿足解": "-",
+        "檢驗結果": "-"
+    }
+
+def _max_rss() -> int:
+    # 目前 process 的最大 RSS (bytes); fork 出來的子 process 不會繼承父 process 的最大值
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024 # macOS 單位為 bytes, Linux 為 KB
+
+def _watch_memory(memout : int, interval : float = 0.05):
+    # 子 process 的 watchdog thread: 最大 RSS 超過 memout 就直接以 MEMOUT_EXIT 結束
+    # (不用 RLIMIT_AS: fork 出來的子 process 一開始就有父 process 約 100 MB 的虛擬記憶體, 小的 memout 會誤判)
+    while _max_rss() < memout:
+        time.sleep(interval)
+    os._exit(MEMOUT_EXIT)
+
+def _worker(conn, path : str, file_name : str, cache_dir : str, memout : int, quiet : bool):
+    # 子 process: 啟動記憶體 watchdog 後解題, 經由 pipe 回傳 ("parsed", n, m) 與 ("done", row) / ("memout",)
+    if quiet:
+        devnull = open(os.devnull, "w")
+        os.dup2(devnull.fileno(), 1)
+    if memout is not None and resource is not None:
+        threading.Thread(target=_watch_memory, args=(memout,), daemon=True).start()
+    try:
+        row = solve_one(path, file_name, cache_dir, lambda n, m: conn.send(("parsed", n, m)))
+        conn.send(("done", row))
+    except MemoryError:
+        conn.send(("memout",))
+    finally:
+        conn.close()
+
+def run_parallel(path : str, files : list, cache_dir : str, jobs : int, timeout : float = None, memout : int = None) -> list:
+    # 每個檔案一個子 process, 同時最多 jobs 個;
+    # 超過 timeout 秒 (wall-clock) 的直接 terminate 並記為 TIMEOUT, 最大 RSS 超過 memout bytes 的記為 MEMOUT
+    # (RSS 含直譯器本身約 20 MB; 沒有 resource 的平台不檢查 memout)
+    ctx = mp.get_context()
+    results = [None] * len(files)
+    pending = list(enumerate(files))[::-1]
+    running = {} # conn -> [i, proc, start_time, n, m]
 
-            # 取得滿足解與執行結果
-            solver_result = solver.find_satisfying_assignments(verbose=False)
-            sols = solver_result["satisfying_assignments"]
-            dfs_calls = solver_result["dfs_counter"]
-            elapsed_time = solver_result["elapsed_time"]
-
-            # 檢查解是否正確
-            errors = solver.check_solution(sols, verbose=False)
-
-            # 存儲結果
-            results.append({
-                "檔名": file_name,
-                "n": solver.n,
-                "m": solver.m,
-                "sat/usat": "sat" if sols else "unsat",
-                "dfs呼叫次數": dfs_calls,
-                "最壞呼叫次數": 2 ** solver.n,
-                "time(hr:min:sec)": elapsed_time,
-                "滿足解": len(sols),
-                "檢驗結果": "錯誤" if errors else "正確"
-            })
+    while pending or running:
+        while pending and len(running) < jobs:
+            i, file_name = pending.pop()
+            parent, child = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_worker, args=(child, path, file_name, cache_dir, memout, True), daemon=True)
+            proc.start()
+            child.close()
+            running[parent] = [i, proc, time.monotonic(), None, None]
+
+        # 等到有結果或最早的 deadline
+        wait_for = None
+        if timeout is not None:
+            now = time.monotonic()
+            wait_for = max(0.0, min(start + timeout for _, _, start, _, _ in running.values()) - now)
+
+        for conn in wait(list(running), wait_for):
+            job = running[conn]
+            i, proc, start = job[0], job[1], job[2]
+            try:
+                msg = conn.recv()
+            except EOFError: # 子 process 沒回傳結果就結束 (例如被 OOM killer 終止)
+                msg = ("crash",)
+            if msg[0] == "parsed":
+                job[3], job[4] = msg[1], msg[2]
+                continue
+            conn.close()
+            proc.join()
+            if msg[0] == "done":
+                results[i] = msg[1]
+            else:
+                # 只有 watchdog 偵測到超過 memout、MemoryError 或被 SIGKILL 終止 (OOM killer / cgroup 記憶體上限) 算 MEMOUT,
+                # 其他異常結束 (例外、segfault 等) 為 ERROR
+                status = "MEMOUT" if msg[0] == "memout" or proc.exitcode in (MEMOUT_EXIT, -SIGKILL) else "ERROR"
+                results[i] = _limit_row(files[i], job[3], job[4], status, time.monotonic() - start)
+            del running[conn]
+            print(f"完成 {sum(r is not None for r in results)}/{len(files)}: {files[i]} ({results[i]['sat/usat']})")
+
+        if timeout is not None:
+            now = time.monotonic()
+            for conn, (i, proc, start, n, m) in list(running.items()):
+                if now - start >= timeout:
+                    proc.terminate()
+                    proc.join()
+                    conn.close()
+                    del running[conn]
+                    results[i] = _limit_row(files[i], n, m, "TIMEOUT", now - start)
+                    print(f"完成 {sum(r is not None for r in results)}/{len(files)}: {files[i]} (TIMEOUT)")
+
+    return results
+
+def run_all_solvers_and_save(path : str, folder_name : str, cache_dir : str = None, jobs : int = 1, timeout : float = None, memout : int = None):
+    # jobs > 1 (或設定 timeout / memout) 時改用多 process 平行執行, 結果列與循序執行相同
+    if cache_dir is None: # 預設把解析後的 instance cache 在資料夾旁
+        cache_dir = os.path.join(path, ".pq_cache")
+
+    # 確保只處理合法的 CNF 檔案 (含壓縮檔)
+    files = [file_name for file_name in os.listdir(path) if file_name.endswith(CNF_SUFFIXES)]
+
+    if jobs > 1 or timeout is not None or memout is not None:
+        os.makedirs(cache_dir, exist_ok=True) # 先建立, 避免多個 process 同時建立
+        results = run_parallel(path, files, cache_dir, jobs, timeout, memout)
+    else:
+        results = []
+        for i_th, file_name in enumerate(files, 1):
+            print(f"處理{i_th}-th檔案: {file_name}")
+            results.append(solve_one(path, file_name, cache_dir))
 
     # 保存結果到 Excel
     xsl.save_to_excel(results, folder_name)
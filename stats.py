@@ -0,0 +1,48 @@
+import json
+
+# =====================================
+# 搜尋統計 (solver.collect_stats = True 時才建立)
+# =====================================
+# 關閉時 F.stats 為 None, 熱路徑只多一次 `is not None` 判斷 (多半在衝突、找到解等不常走到的分支中)。
+# 計數只涵蓋 H_1.1'' (_dfs3 / _run3 / solve), 其他 heuristic 只有 init / search 的時間。
+#   weight_evals : 重新計算權重的子句數 (_reweight3 收到的 touched 子句, 遇到衝突時其餘的不會真的算)
+#   heap_pushes / heap_removes / heap_pops : pq 的 push (含更新 weight)、因權重 > 0 移出、取出
+#   unit_props   : unit clause 傳遞設定的 literal 數 (權重 < -8 的子句與 watched literal)
+#   conflicts    : 依種類 ec (子句全為 false) / bonus (bonus == -100) / shoot (unit 在已探索過的分支) / watch (watched literal 衝突)
+#   bytes_copied : 複製配置 (找到的解) 的 bytes (sys.getsizeof)
+#   phase_seconds: 各階段的秒數; process / reweight 包含在 search 之中
+class SearchStats:
+    __slots__ = ("weight_evals", "heap_pushes", "heap_removes", "heap_pops", "unit_props", "conflicts", "bytes_copied", "phase_seconds")
+
+    def __init__(self):
+        self.weight_evals = 0
+        self.heap_pushes = 0
+        self.heap_removes = 0
+        self.heap_pops = 0
+        self.unit_props = 0
+        self.conflicts = {"ec": 0, "bonus": 0, "shoot": 0, "watch": 0}
+        self.bytes_copied = 0
+        self.phase_seconds = {}
+
+    def add_time(self, phase : str, seconds : float):
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "weight_evals": self.weight_evals,
+            "heap_pushes": self.heap_pushes,
+            "heap_removes": self.heap_removes,
+            "heap_pops": self.heap_pops,
+            "unit_props": self.unit_props,
+            "conflicts": dict(self.conflicts),
+            "bytes_copied": self.bytes_copied,
+            "phase_seconds": dict(self.phase_seconds),
+        }
+
+    def to_json(self, path : str = None) -> str:
+        # 回傳 JSON 字串, 有給 path 時同時寫入檔案
+        text = json.dumps(self.as_dict(), indent=1)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
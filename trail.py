@@ -0,0 +1,113 @@
+from array import array
+from indexed_heap import IndexedHeap
+from clause_db import ClauseCounters
+from assignment import TRUE, FORCED, SHOOT
+
+# =====================================
+# 回溯用的 trail (undo log)
+# =====================================
+# 取代每個節點對 pq / invalid / touched_cnt / shoot / forced 的 deepcopy,
+# 只記錄「這個分支實際改了什麼」, 回溯時依序反向復原。
+#   assign_log : (x, kind)       新設定的變數 (kind: 1 設為 1, 2 forced, 3 shoot; forced 的 x 為 -var)
+#   weight_log : (cid, old)      invalid table 的舊權重
+#   heap_log   : (cid, old)      pq (IndexedHeap) 中 cid 的舊 weight, 不在 pq 中為 None
+#   touch_log  : var             touched_cnt 的 +1
+#   levels     : 每個 decision level 開始時四個 log 的長度 (marker)
+# 配置 (ClauseCounters.value, 見 assignment.py) 與 touched_cnt 的變化 (含回溯) 會同步更新 ClauseCounters。
+class Trail:
+    def __init__(self, pq : IndexedHeap, invalid : array, touched_cnt : list, counters : ClauseCounters):
+        self.pq = pq
+        self.invalid = invalid
+        self.touched_cnt = touched_cnt
+        self.counters = counters
+        self.value = counters.value
+        self.assign_log = []
+        self.weight_log = []
+        self.heap_log = []
+        self.touch_log = []
+        self.levels = []
+
+    def new_level(self):
+        self.levels.append((len(self.assign_log), len(self.weight_log), len(self.heap_log), len(self.touch_log)))
+        return len(self.levels)
+
+    def backtrack(self):
+        a, w, h, t = self.levels.pop()
+
+        assign_log = self.assign_log
+        counters = self.counters
+        while len(assign_log) > a:
+            x, kind = assign_log.pop()
+            if kind == 1:
+                counters.unassign(x)
+            elif kind == 2:
+                counters.unforce(x)
+            else:
+                counters.unshoot(x)
+
+        weight_log = self.weight_log
+        invalid = self.invalid
+        while len(weight_log) > w:
+            cid, old = weight_log.pop()
+            invalid[cid] = old
+
+        heap_log = self.heap_log
+        pq = self.pq
+        while len(heap_log) > h:
+            cid, old = heap_log.pop()
+            if old is None:
+                pq.remove(cid)
+            else:
+                pq.push(cid, old)
+
+        touch_log = self.touch_log
+        touched_cnt = self.touched_cnt
+        while len(touch_log) > t:
+            var = touch_log.pop()
+            touched_cnt[var] -= 1
+            if touched_cnt[var] == 0:
+                counters.untouch(var)
+
+    def backtrack_to(self, level : int):
+        while len(self.levels) >= level:
+            self.backtrack()
+
+    # ---------- 會被記錄的修改 ----------
+    def shoot(self, var : int):
+        # 已探索過的分支變數
+        if not self.value[var] & SHOOT:
+            self.assign_log.append((var, 3))
+            self.counters.shoot(var)
+
+    def assign(self, var : int):
+        # var 設為 1
+        if not self.value[var] & TRUE:
+            self.assign_log.append((var, 1))
+            self.counters.assign(var)
+
+    def force(self, lit : int):
+        # lit = -var, var 被強制設為 0
+        if not self.value[-lit] & FORCED:
+            self.assign_log.append((lit, 2))
+            self.counters.force(lit)
+
+    def set_weight(self, cid : int, weight : int, enqueue : bool):
+        # 更新 invalid table; enqueue 為 False 時把 cid 移出 pq (原本的 entry 已過期)
+        invalid = self.invalid
+        self.weight_log.append((cid, invalid[cid]))
+        invalid[cid] = weight
+        if enqueue:
+            self.heap_log.append((cid, self.pq.push(cid, weight)))
+        elif cid in self.pq:
+            self.heap_log.append((cid, self.pq.remove(cid)))
+
+    def pop(self) -> tuple:
+        item = self.pq.pop()
+        self.heap_log.append((item[1], item[0]))
+        return item
+
+    def touch(self, var : int):
+        self.touched_cnt[var] += 1
+        self.touch_log.append(var)
+        if self.touched_cnt[var] == 1:
+            self.counters.touch(var)
@@ -0,0 +1,99 @@
+from array import array
+from assignment import TRUE, FORCED
+
+# =====================================
+# Two-watched-literal 傳遞
+# =====================================
+# 與 ClauseCounters 相同的真假定義:
+#   正 literal v  : value[v] 為 TRUE 時為 true, FORCED (被強制為 0) 時為 false
+#   負 literal -v : value[v] 為 FORCED 時為 true, TRUE 時為 false
+# 每個子句看兩個「不同」的 literal, 只有其中一個變成 false 時才去找替代, 找不到就是 unit (或衝突)。
+# 回溯時不需要還原 watch (只要 assign / force 依 LIFO 順序撤銷, watch 一樣成立)。
+# 只有一種 literal 的子句 (長度 1) 不看, 交給權重的 unit clause 處理。
+# 學到的子句 (見 learning.py) 的 id 從 m 開始, literal 存在 learned 中。
+class WatchedLiterals:
+    def __init__(self, db, value):
+        self.db = db
+        self.value = value # ClauseCounters.value
+        self.m = m = len(db)
+        self.learned = [] # learned[cid - m] : 學到的子句 (list), 已刪除為 None
+        self.conflict = -1 # 最近一次衝突 (全部為 false) 的子句 id
+        self.w = array('i', bytes(8 * m)) # w[2*cid], w[2*cid+1] : 兩個被看的 literal, 0 代表不看
+        self.watches = [[] for _ in range(2 * (db.n + 1))]
+        for cid, clause in enumerate(db):
+            a = clause[0] if len(clause) else 0
+            b = next((l for l in clause if l != a), 0)
+            if b == 0:
+                continue
+            self.w[2 * cid] = a
+            self.w[2 * cid + 1] = b
+            self.watches[self._idx(a)].append(cid)
+            self.watches[self._idx(b)].append(cid)
+
+    @staticmethod
+    def _idx(lit : int) -> int:
+        return 2 * lit if lit > 0 else -2 * lit + 1
+
+    def _false(self, lit : int) -> bool:
+        return bool(self.value[lit] & FORCED if lit > 0 else self.value[-lit] & TRUE)
+
+    def _true(self, lit : int) -> bool:
+        return bool(self.value[lit] & TRUE if lit > 0 else self.value[-lit] & FORCED)
+
+    def clause(self, cid : int):
+        return self.db[cid] if cid < self.m else self.learned[cid - self.m]
+
+    def add_clause(self, cid : int, lits : list, a : int, b : int):
+        # 加入學到的子句, 看 a, b 兩個 literal
+        k = cid - self.m
+        while len(self.learned) <= k:
+            self.learned.append(None)
+            self.w.extend((0, 0))
+        self.learned[k] = lits
+        self.w[2 * cid] = a
+        self.w[2 * cid + 1] = b
+        self.watches[self._idx(a)].append(cid)
+        self.watches[self._idx(b)].append(cid)
+
+    def remove_clause(self, cid : int):
+        for slot in (2 * cid, 2 * cid + 1):
+            self.watches[self._idx(self.w[slot])].remove(cid)
+            self.w[slot] = 0
+        self.learned[cid - self.m] = None
+
+    def falsify(self, lit : int, units : list) -> bool:
+        # lit 剛變成 false; 因此成為 unit 的子句, 把 (剩下的 literal, 子句 id) 加入 units
+        # 有子句全部為 false 時記在 self.conflict 並回傳 False
+        db, m, w, value = self.db, self.m, self.w, self.value
+        ws = self.watches[self._idx(lit)]
+        i = j = 0
+        k = len(ws)
+        while i < k:
+            cid = ws[i]
+            i += 1
+            slot = 2 * cid if w[2 * cid] == lit else 2 * cid + 1
+            other = w[slot ^ 1]
+            if value[other] & TRUE if other > 0 else value[-other] & FORCED: # 另一個 literal 已經是 true
+                ws[j] = cid
+                j += 1
+                continue
+
+            for l in (db[cid] if cid < m else self.learned[cid - m]):
+                if l != lit and l != other and not (value[l] & FORCED if l > 0 else value[-l] & TRUE):
+                    w[slot] = l # 改看 l
+                    self.watches[self._idx(l)].append(cid)
+                    break
+            else:
+                ws[j] = cid
+                j += 1
+                if value[other] & FORCED if other > 0 else value[-other] & TRUE: # 全部為 false
+                    while i < k:
+                        ws[j] = ws[i]
+                        i += 1
+                        j += 1
+                    del ws[j:]
+                    self.conflict = cid
+                    return False
+                units.append((other, cid))
+        del ws[j:]
+        return True